@@ -12,22 +12,49 @@ Użycie:
     python main.py --rules data/rules.txt --signals examples/signals.txt
     python main.py --interactive
     python main.py --single "w3,f3,t1,r1,a1,d4"
+    python main.py --signals "archive/2024-*.txt.gz"
 """
 
 import sys
+import time
 import argparse
+import itertools
 from pathlib import Path
 
+# Start of the 'imports' phase reported by --profile
+_IMPORTS_STARTED = (time.perf_counter(), time.process_time())
+
 from rich.console import Console
 
 from src.parser.rule_parser import parse_rules_file
 from src.evaluator.signal import parse_signal
 from src.evaluator.threat_matcher import ThreatMatcher
+from src.evaluator.codes import LEVEL_NAMES, LEVEL_CODES, signal_code, signal_difficulty
+from src.evaluator.compact import BatchClassifier
+from src.evaluator.memo import POLICIES, MemoizedMatcher
 from src.stream import StreamProcessor, SignalReader
 from src.ui import ThreatPresenter
+from src.input_sources import (
+    STDIN, InputStats, expand_sources, is_compressed, iter_signal_lines
+)
+from src.archive import ArchiveReader, ArchiveWriter, parse_query, rules_version
+from src.archive.replay import replay_archive
+from src.time_windows import (
+    WindowedAggregator, bucket_seconds_for, format_duration, parse_duration,
+    parse_escalation_rule, split_timestamp
+)
+from src.profiling import PhaseProfiler
+
+_IMPORTS_FINISHED = (time.perf_counter(), time.process_time())
 
 console = Console()
 
+# Replaced in main() when --profile / --profile-out is given
+profiler = PhaseProfiler(enabled=False)
+
+# Only the first errors are kept so memory stays bounded on huge archives
+MAX_REPORTED_ERRORS = 100
+
 
 def main():
     """Główna funkcja programu"""
@@ -45,6 +72,33 @@ Examples:
   # Single signal assessment
   python main.py --rules data/rules.txt --single "w3,f3,t1,r1,a1,d4"
 
+  # Compressed archives, globs, directories or stdin (-)
+  python main.py --rules data/rules.txt --signals "archive/*.txt.gz" --compact
+  zcat signals.txt.gz | python main.py --rules data/rules.txt --signals - --compact
+
+  # Columnar batch mode (level totals only, no per-signal output)
+  python main.py --rules data/rules.txt --signals "archive/*.txt.gz" --batch
+
+  # Sliding windows (5/15/60 min) with escalation alerts
+  python main.py --rules data/rules.txt --signals - --compact --windows 5,15,60 \\
+      --alert "15m@d4:count>=10" --alert "5m:rate>=3,min=5"
+
+  # Archive results, then query the archive
+  python main.py --rules data/rules.txt --signals "archive/*.txt.gz" --compact --archive store/
+  python main.py --archive store/ --query "E5 d4 from=2025-01-05T06:00 to=2025-01-05T09:00"
+  python main.py --archive store/ --query "by=day"
+
+  # What-if replay: archived signals that change level under edited rules
+  python main.py --rules data/rules_new.txt --archive store/ --replay
+  python main.py --rules data/rules_new.txt --archive store/ --replay --query "from=2025-01-01"
+
+  # Per-phase timing, cProfile dump and flamegraph stacks
+  python main.py --rules data/rules.txt --signals signals.txt.gz --compact --profile
+  python main.py --rules data/rules.txt --signals signals.txt.gz --batch --profile-out prof/run1
+
+  # Memoising classification cache (LRU or CLOCK)
+  python main.py --rules data/rules.txt --signals - --compact --cache 1024 --cache-policy clock
+
   # Compact output
   python main.py --rules data/rules.txt --signals examples/signals.txt --compact
 
@@ -63,7 +117,8 @@ Examples:
     parser.add_argument(
         '--signals',
         type=str,
-        help='Path to signals file (CSV format)'
+        help='Signals file (CSV format, optionally .gz/.xz/.bz2), '
+             'directory, glob pattern or - for stdin'
     )
 
     parser.add_argument(
@@ -84,6 +139,51 @@ Examples:
         help='Compact output (one line per signal)'
     )
 
+    parser.add_argument(
+        '--batch',
+        action='store_true',
+        help='Batch mode: columnar classification, summary only'
+    )
+
+    parser.add_argument(
+        '--windows',
+        type=str,
+        help='Sliding windows for E4+ counts, e.g. 5,15,60 (minutes) or 30s,1h'
+    )
+
+    parser.add_argument(
+        '--alert',
+        action='append',
+        default=[],
+        help='Escalation rule, e.g. "15m@d4:count>=10" or "5m:rate>=3" (repeatable)'
+    )
+
+    parser.add_argument(
+        '--alert-level',
+        type=str.upper,
+        choices=LEVEL_NAMES[1:],
+        default='E4',
+        help='Minimum threat level counted by windows and alerts (default: E4)'
+    )
+
+    parser.add_argument(
+        '--archive',
+        type=str,
+        help='Archive directory: results are appended to it, --query reads it'
+    )
+
+    parser.add_argument(
+        '--query',
+        type=str,
+        help='Query the archive, e.g. "E5 d4 from=2025-01-05T06:00 to=...", "by=day"'
+    )
+
+    parser.add_argument(
+        '--replay',
+        action='store_true',
+        help='Report archived signals classified differently under --rules'
+    )
+
     parser.add_argument(
         '--trace',
         action='store_true',
@@ -102,24 +202,72 @@ Examples:
         help='Debug mode'
     )
 
+    parser.add_argument(
+        '--cache',
+        type=int,
+        metavar='N',
+        help='Cache up to N assessments keyed by signal (reports hit rate)'
+    )
+
+    parser.add_argument(
+        '--cache-policy',
+        choices=POLICIES,
+        default='lru',
+        help='Cache eviction policy (default: lru)'
+    )
+
+    parser.add_argument(
+        '--profile',
+        action='store_true',
+        help='Report wall-clock and CPU time per processing phase'
+    )
+
+    parser.add_argument(
+        '--profile-out',
+        type=str,
+        metavar='PREFIX',
+        help='With profiling, write PREFIX.pstats and PREFIX.collapsed (flamegraph); '
+             'the input is processed twice more, under cProfile and under sampling'
+    )
+
     args = parser.parse_args()
 
+    global profiler
+    profiler = PhaseProfiler(enabled=args.profile, output_prefix=args.profile_out)
+    profiler.add(
+        'imports',
+        _IMPORTS_FINISHED[0] - _IMPORTS_STARTED[0],
+        _IMPORTS_FINISHED[1] - _IMPORTS_STARTED[1]
+    )
+
     # Banner
     console.print("\n[bold cyan]Mountain Tourist Monitoring System[/bold cyan]")
     console.print("[dim]Akademia Tarnowska - Jezyki formalne i kompilatory II[/dim]\n")
 
     try:
+        # Archive queries need no rules
+        if args.query is not None and not args.replay:
+            process_query(args.query, args)
+            return
+
+        check_batch_options(args)
+
         # 1. Load rules
         console.print(f"[yellow]Loading rules from:[/yellow] {args.rules}")
-        rules_db = parse_rules_file(args.rules)
+        rules_db = profiler.profile_rules_parse(parse_rules_file, args.rules)
         console.print("[green]Rules loaded successfully![/green]\n")
 
         # 2. Create components
         presenter = ThreatPresenter(console)
-        matcher = ThreatMatcher(rules_db, debug=args.debug)
+        with profiler.phase('matcher compilation'):
+            matcher = create_matcher(rules_db, args)
 
         # 3. Process based on mode
-        if args.single:
+        if args.replay:
+            # What-if replay over the archive
+            process_replay(matcher, args)
+
+        elif args.single:
             # Single signal mode
             process_single_signal(args.single, matcher, presenter, args)
 
@@ -132,10 +280,13 @@ Examples:
             process_signals_file(args.signals, matcher, presenter, args)
 
         else:
-            console.print("[red]Error: Please specify --signals, --single, or --interactive[/red]")
+            console.print("[red]Error: Please specify --signals, --single, --interactive or --replay[/red]")
             console.print("Use --help for more information")
             sys.exit(1)
 
+        if profiler.enabled:
+            show_profile(rules_db, presenter, args)
+
     except FileNotFoundError as e:
         console.print(f"\n[bold red]File Not Found:[/bold red] {str(e)}\n")
         sys.exit(1)
@@ -150,22 +301,57 @@ Examples:
         sys.exit(1)
 
 
+def create_matcher(rules_db, args):
+    """ThreatMatcher, wrapped in the memo cache with --cache"""
+    matcher = ThreatMatcher(rules_db, debug=args.debug)
+    if args.cache:
+        matcher = MemoizedMatcher(matcher, args.cache, args.cache_policy)
+    return matcher
+
+
+def check_batch_options(args):
+    """
+    --batch applies to --signals only, and batch results carry no time or
+    source - reject options it would ignore
+    """
+    if not args.batch:
+        return
+
+    unsupported = [
+        option for option, value in (
+            ('--single', args.single),
+            ('--interactive', args.interactive),
+            ('--replay', args.replay),
+            ('--windows', args.windows),
+            ('--alert', args.alert),
+            ('--archive', args.archive),
+            ('--cache', args.cache),
+        ) if value
+    ]
+    if unsupported:
+        console.print(f"[red]Error: --batch cannot be combined with {', '.join(unsupported)}[/red]")
+        sys.exit(1)
+
+
 def process_single_signal(signal_str: str, matcher, presenter, args):
     """Process a single signal"""
     console.print(f"[yellow]Processing signal:[/yellow] {signal_str}\n")
 
     try:
-        signal = parse_signal(signal_str)
-        assessment = matcher.assess_threat(signal, include_trace=args.trace)
+        with profiler.phase('signal parsing'):
+            signal = parse_signal(signal_str)
+        with profiler.phase('classification'):
+            assessment = matcher.assess_threat(signal, include_trace=args.trace)
 
-        if args.compact:
-            presenter.show_compact(assessment)
-        else:
-            presenter.show_assessment(
-                assessment,
-                show_trace=args.trace,
-                show_recommendations=True
-            )
+        with profiler.phase('output'):
+            if args.compact:
+                presenter.show_compact(assessment)
+            else:
+                presenter.show_assessment(
+                    assessment,
+                    show_trace=args.trace,
+                    show_recommendations=True
+                )
 
     except ValueError as e:
         console.print(f"[red]Invalid signal format:[/red] {str(e)}")
@@ -182,24 +368,30 @@ def process_interactive(matcher, presenter, args):
     assessments = []
 
     try:
-        for signal in SignalReader.read_stdin():
-            assessment = matcher.assess_threat(signal, include_trace=args.trace)
+        # Reading includes waiting for the user and parsing the signal
+        for signal in profiler.timed_iter(SignalReader.read_stdin(), 'input reading'):
+            with profiler.phase('classification'):
+                assessment = matcher.assess_threat(signal, include_trace=args.trace)
             assessments.append(assessment)
 
-            if args.compact:
-                presenter.show_compact(assessment)
-            else:
-                presenter.show_assessment(
-                    assessment,
-                    show_trace=args.trace,
-                    show_recommendations=True
-                )
+            with profiler.phase('output'):
+                if args.compact:
+                    presenter.show_compact(assessment)
+                else:
+                    presenter.show_assessment(
+                        assessment,
+                        show_trace=args.trace,
+                        show_recommendations=True
+                    )
 
-            console.print()  # Empty line between assessments
+                console.print()  # Empty line between assessments
 
     except KeyboardInterrupt:
         console.print("\n[yellow]Exiting interactive mode...[/yellow]")
 
+    if isinstance(matcher, MemoizedMatcher):
+        console.print(f"\n[bold]Cache ({matcher.policy}):[/bold] {matcher.stats}")
+
     # Show statistics if we processed any signals
     if assessments and not args.no_stats:
         console.print("\n")
@@ -208,6 +400,20 @@ def process_interactive(matcher, presenter, args):
 
 def process_signals_file(file_path: str, matcher, presenter, args):
     """Process signals from file"""
+    sources = expand_sources(file_path)
+
+    if args.batch:
+        process_signal_batches(sources, matcher, args)
+        return
+
+    # Compressed, multi-file and stdin inputs, and runs with windows, archive
+    # or cache, go through the bounded-memory streaming path; a single plain
+    # file otherwise keeps using StreamProcessor (also under --profile)
+    if (len(sources) > 1 or sources[0] == STDIN or is_compressed(sources[0])
+            or args.windows or args.alert or args.archive or args.cache):
+        process_signal_stream(sources, matcher, presenter, args)
+        return
+
     console.print(f"[yellow]Processing signals from:[/yellow] {file_path}\n")
 
     # Create processor with callback for real-time display
@@ -233,8 +439,10 @@ def process_signals_file(file_path: str, matcher, presenter, args):
         debug=args.debug
     )
 
-    # Process file
-    result = processor.process_file(file_path)
+    # Process file (StreamProcessor reads, parses, classifies and shows
+    # signals in one loop - profiled as a single phase)
+    with profiler.phase('file processing'):
+        result = processor.process_file(file_path)
 
     # If compact mode and we didn't show during processing, show now
     if args.compact and not on_signal:
@@ -248,6 +456,13 @@ def process_signals_file(file_path: str, matcher, presenter, args):
     console.print(f"  Errors: {len(result.errors)}")
     console.print(f"  Processing time: {result.processing_time:.3f}s")
 
+    if result.processing_time > 0:
+        size_mb = Path(file_path).stat().st_size / (1024 * 1024)
+        console.print(
+            f"  Throughput: {size_mb / result.processing_time:.2f} MB/s, "
+            f"{result.total_signals / result.processing_time:.0f} signals/s"
+        )
+
     if result.errors and args.debug:
         console.print("\n[red]Errors:[/red]")
         for error in result.errors:
@@ -259,5 +474,378 @@ def process_signals_file(file_path: str, matcher, presenter, args):
         presenter.show_statistics(result.assessments)
 
 
+def process_signal_stream(sources, matcher, presenter, args):
+    """Process compressed / multi-file / stdin input without keeping assessments"""
+    label = "stdin" if sources == [STDIN] else f"{len(sources)} source(s)"
+    console.print(f"[yellow]Streaming signals from:[/yellow] {label}\n")
+
+    stats = InputStats()
+    level_counts = {}
+    errors = []
+    aggregator = create_aggregator(args)
+    writer = create_archive_writer(args)
+    needs_code = aggregator is not None or writer is not None
+    unencoded = 0
+
+    try:
+        for source in sources:
+            source_id = writer.source_id(source) if writer is not None else 0
+
+            # Each phase handles a chunk of lines at a time, so --profile
+            # times chunks instead of adding clock reads to every signal
+            lines = iter_signal_lines([source], stats=stats)
+            for chunk in profiler.timed_chunks(lines, 'input reading'):
+                parsed = []
+                with profiler.phase('signal parsing', len(chunk)):
+                    for line in chunk:
+                        try:
+                            timestamp, signal_text = split_timestamp(line)
+                            parsed.append((line, timestamp, parse_signal(signal_text)))
+                        except ValueError as e:
+                            stats.errors += 1
+                            if len(errors) < MAX_REPORTED_ERRORS:
+                                errors.append(f"{line}: {e}")
+
+                assessed = []
+                with profiler.phase('classification', len(parsed)):
+                    for line, timestamp, signal in parsed:
+                        try:
+                            assessment = matcher.assess_threat(signal, include_trace=args.trace)
+                        except ValueError as e:
+                            stats.errors += 1
+                            if len(errors) < MAX_REPORTED_ERRORS:
+                                errors.append(f"{line}: {e}")
+                            continue
+                        assessed.append((timestamp, signal, assessment))
+
+                # Windows and archive rows are updated in signal order with
+                # the output, so escalations print next to their signals
+                with profiler.phase('output', len(assessed)):
+                    for timestamp, signal, assessment in assessed:
+                        stats.signals += 1
+                        level = assessment.threat_level.value
+                        level_counts[level] = level_counts.get(level, 0) + 1
+
+                        if needs_code:
+                            try:
+                                code = signal_code(signal)
+                            except ValueError:
+                                # Valid signal outside the code alphabet: counted,
+                                # but not windowed or archived
+                                code = None
+                                unencoded += 1
+                            if timestamp is None:
+                                timestamp = time.time()
+                            if aggregator is not None and code is not None:
+                                aggregator.add(LEVEL_CODES[level], signal_difficulty(code), timestamp)
+                            if writer is not None and code is not None:
+                                writer.append(timestamp, source_id, code, LEVEL_CODES[level])
+
+                        if args.compact:
+                            presenter.show_compact(assessment)
+                        else:
+                            presenter.show_assessment(
+                                assessment,
+                                show_trace=args.trace,
+                                show_recommendations=False
+                            )
+                            console.print()
+    finally:
+        if writer is not None:
+            writer.close()
+
+    stats.finish()
+
+    # Show summary
+    console.print(f"\n[bold]Processing Summary:[/bold]")
+    console.print(f"  Sources: {stats.sources}")
+    show_failed_sources(stats)
+    console.print(f"  Total signals: {stats.lines}")
+    console.print(f"  Successfully processed: {stats.signals}")
+    console.print(f"  Errors: {stats.errors}")
+    console.print(f"  Processing time: {stats.elapsed:.3f}s")
+    console.print(
+        f"  Read: {stats.bytes_read / (1024 * 1024):.2f} MB "
+        f"({stats.bytes_decoded / (1024 * 1024):.2f} MB decompressed)"
+    )
+    console.print(
+        f"  Throughput: {stats.mb_per_second:.2f} MB/s, "
+        f"{stats.signals_per_second:.0f} signals/s"
+    )
+    if writer is not None:
+        console.print(f"  Archived: {writer.rows_written} rows -> {args.archive}")
+    if unencoded:
+        console.print(f"  Not windowed/archived (outside signal codes): {unencoded}")
+    if isinstance(matcher, MemoizedMatcher):
+        console.print(f"  Cache ({matcher.policy}): {matcher.stats}")
+
+    if errors and args.debug:
+        console.print("\n[red]Errors:[/red]")
+        for error in errors:
+            console.print(f"  - {error}")
+
+    if level_counts and not args.no_stats:
+        console.print("\n[bold]Threat Levels:[/bold]")
+        for level in sorted(level_counts):
+            count = level_counts[level]
+            console.print(f"  {level}: {count} ({100 * count / stats.signals:.1f}%)")
+
+    if aggregator is not None:
+        show_windows(aggregator, args)
+
+
+def show_failed_sources(stats):
+    """List sources skipped because they could not be read or decompressed"""
+    if not stats.failed_sources:
+        return
+    console.print(f"  [red]Failed sources (skipped): {len(stats.failed_sources)}[/red]")
+    for failure in stats.failed_sources:
+        console.print(f"    - {failure}")
+
+
+def create_archive_writer(args):
+    """Open archive for appending results (--archive)"""
+    if not args.archive:
+        return None
+    rules_text = Path(args.rules).read_text(encoding='utf-8')
+    return ArchiveWriter(args.archive, rules_version(rules_text), rules_text)
+
+
+def create_aggregator(args):
+    """Create sliding-window aggregator from --windows/--alert options"""
+    if not args.windows and not args.alert:
+        return None
+
+    min_level = LEVEL_CODES[args.alert_level]
+    windows = [parse_duration(w) for w in args.windows.split(',')] if args.windows else []
+    rules = [parse_escalation_rule(spec, min_level) for spec in args.alert]
+    bucket_seconds = bucket_seconds_for(windows + [rule.window for rule in rules])
+
+    def on_escalation(rule, count, previous, timestamp):
+        console.print(
+            f"[bold red]ESCALATION:[/bold red] {rule.describe()} "
+            f"- now {count}, previous {previous}"
+        )
+
+    return WindowedAggregator(
+        windows, bucket_seconds, rules=rules, on_escalation=on_escalation
+    )
+
+
+def show_windows(aggregator, args):
+    """Show E4+ counts per difficulty for each sliding window"""
+    min_level = LEVEL_CODES[args.alert_level]
+    console.print(f"\n[bold]Sliding Windows (E{min_level}+ per difficulty):[/bold]")
+    for window, counts in aggregator.snapshot(min_level).items():
+        per_difficulty = "  ".join(f"d{d}: {c}" for d, c in enumerate(counts, 1))
+        console.print(f"  last {format_duration(window):>7}  {per_difficulty}  total: {sum(counts)}")
+    if aggregator.late_dropped:
+        console.print(f"  [dim]Late signals dropped: {aggregator.late_dropped}[/dim]")
+
+
+def _strip_timestamp(line: str) -> str:
+    """Signal part of a line; invalid lines are passed on to be counted as errors"""
+    try:
+        return split_timestamp(line)[1]
+    except ValueError:
+        return line
+
+
+def process_signal_batches(sources, matcher, args):
+    """Batch mode - classify into columnar batches, report totals only"""
+    label = "stdin" if sources == [STDIN] else f"{len(sources)} source(s)"
+    console.print(f"[yellow]Batch processing signals from:[/yellow] {label}\n")
+
+    stats = InputStats()
+    classifier = BatchClassifier(matcher)
+    level_counts = [0] * len(LEVEL_NAMES)
+    errors = []
+    peak_batch_bytes = 0
+
+    chunks = profiler.timed_chunks(iter_signal_lines(sources, stats=stats), 'input reading')
+    lines = itertools.chain.from_iterable(chunks)
+    wall, cpu = time.perf_counter(), time.process_time()
+
+    # Batch results carry no time - drop optional leading timestamps
+    signal_lines = (_strip_timestamp(line) for line in lines)
+
+    for batch in classifier.iter_batches(signal_lines):
+        stats.signals += len(batch)
+        stats.errors += batch.error_count
+        peak_batch_bytes = max(peak_batch_bytes, batch.nbytes)
+
+        for level, count in enumerate(batch.level_counts()):
+            level_counts[level] += count
+
+        for error in batch.errors:
+            if len(errors) < MAX_REPORTED_ERRORS:
+                errors.append(error)
+
+    stats.finish()
+
+    # Signal encoding and classification run interleaved with reading inside
+    # iter_batches; charge everything except reading to classification
+    if profiler.enabled:
+        profiler.add(
+            'classification',
+            time.perf_counter() - wall - profiler.wall.get('input reading', 0.0),
+            time.process_time() - cpu - profiler.cpu.get('input reading', 0.0),
+            calls=stats.signals
+        )
+
+    console.print(f"[bold]Processing Summary:[/bold]")
+    console.print(f"  Sources: {stats.sources}")
+    show_failed_sources(stats)
+    console.print(f"  Total signals: {stats.lines}")
+    console.print(f"  Successfully processed: {stats.signals}")
+    console.print(f"  Errors: {stats.errors}")
+    console.print(f"  Processing time: {stats.elapsed:.3f}s")
+    console.print(
+        f"  Throughput: {stats.mb_per_second:.2f} MB/s, "
+        f"{stats.signals_per_second:.0f} signals/s"
+    )
+    console.print(f"  Peak batch size: {peak_batch_bytes / 1024:.1f} KB")
+
+    if errors and args.debug:
+        console.print("\n[red]Errors:[/red]")
+        for error in errors:
+            console.print(f"  - {error}")
+
+    if stats.signals and not args.no_stats:
+        console.print("\n[bold]Threat Levels:[/bold]")
+        for level in range(1, len(LEVEL_NAMES)):
+            count = level_counts[level]
+            console.print(
+                f"  {LEVEL_NAMES[level]}: {count} ({100 * count / stats.signals:.1f}%)"
+            )
+
+
+def can_process_twice(args) -> bool:
+    """True if the input can be processed again for the --profile-out pass"""
+    if args.replay or args.single:
+        return True
+    return bool(args.signals) and STDIN not in expand_sources(args.signals)
+
+
+def record_profile(rules_db, presenter, args):
+    """Process the same input again under cProfile for --profile-out dumps"""
+    if args.replay:
+        process_replay(create_matcher(rules_db, args), args)
+    elif args.single:
+        process_single_signal(args.single, create_matcher(rules_db, args), presenter, args)
+    else:
+        # Rows were archived by the measured pass
+        args = argparse.Namespace(**{**vars(args), 'archive': None})
+        process_signals_file(args.signals, create_matcher(rules_db, args), presenter, args)
+
+
+def show_profile(rules_db, presenter, args):
+    """Show per-phase timing (--profile) and write dumps (--profile-out)"""
+    recorded = profiler.output_prefix is not None and can_process_twice(args)
+    if recorded:
+        profiler.record(record_profile, rules_db, presenter, args)
+
+    pstats_path, collapsed_path = profiler.write_dumps()
+
+    console.print("\n[bold]Profile:[/bold]")
+    console.print(profiler.format_report(), markup=False, highlight=False)
+
+    if pstats_path:
+        console.print(f"  cProfile dump: {pstats_path}")
+    if collapsed_path:
+        console.print(f"  Collapsed stacks: {collapsed_path}")
+    if profiler.output_prefix is not None and not recorded:
+        console.print("  [dim]stdin/interactive input cannot be read twice - dumps cover rules parsing only[/dim]")
+
+
+def parse_query_option(query_text: str):
+    """Parse --query, exiting with an error message if it is invalid"""
+    try:
+        return parse_query(query_text)
+    except (ValueError, KeyError) as e:
+        console.print(f"[red]Invalid query:[/red] {e}")
+        sys.exit(1)
+
+
+def process_query(query_text: str, args):
+    """Query mode - answer from the archive"""
+    if not args.archive:
+        console.print("[red]Error: --query requires --archive[/red]")
+        sys.exit(1)
+
+    query = parse_query_option(query_text)
+
+    with ArchiveReader(args.archive) as reader:
+        result = reader.query(query)
+
+    console.print(f"[yellow]Query:[/yellow] {query_text or '(all)'}\n")
+
+    if result.rows and not query.group_by:
+        console.print("[bold]Rows:[/bold]")
+        for row in result.rows:
+            console.print(f"  {row}")
+        if result.total > len(result.rows):
+            console.print(f"  [dim]... {result.total - len(result.rows)} more[/dim]")
+        console.print()
+
+    if query.group_by:
+        header = "  ".join(f"{name:>8}" for name in LEVEL_NAMES[1:])
+        console.print(f"[bold]{'Day' if query.group_by == 'day' else 'Hour':<16}  {header}     Total[/bold]")
+        for group, counts in result.groups.items():
+            cells = "  ".join(f"{count:>8}" for count in counts[1:])
+            console.print(f"{group:<16}  {cells}  {sum(counts):>8}")
+        console.print()
+
+    console.print(f"[bold]Matching rows:[/bold] {result.total}")
+    console.print("  " + "  ".join(
+        f"{name}: {result.level_counts[code]}" for code, name in enumerate(LEVEL_NAMES) if name
+    ))
+    console.print(
+        f"[dim]Scanned {result.blocks_scanned}/{result.blocks_total} blocks "
+        f"in {result.elapsed:.3f}s[/dim]"
+    )
+
+
+def process_replay(matcher, args):
+    """Replay mode - diff archived classifications against the loaded rules"""
+    if not args.archive:
+        console.print("[red]Error: --replay requires --archive[/red]")
+        sys.exit(1)
+
+    query = parse_query_option(args.query) if args.query else None
+    if query is not None and query.group_by:
+        console.print("[red]Error: --replay does not support by=day/by=hour[/red]")
+        sys.exit(1)
+    console.print(f"[yellow]Replaying archive:[/yellow] {args.archive} "
+                  f"[yellow]against[/yellow] {args.rules}\n")
+
+    report = replay_archive(args.archive, matcher, query)
+
+    for version, count in report.changed_codes.items():
+        console.print(f"  Rules {version}: {count} signal codes change level")
+    if report.versions_from_counts:
+        console.print(f"  [dim]Answered from code counts: {', '.join(report.versions_from_counts)}[/dim]")
+    if report.stale_counts:
+        console.print(f"  [dim]Code counts out of date, scanned instead: {', '.join(report.stale_counts)}[/dim]")
+    console.print()
+
+    if report.transitions:
+        console.print(f"[bold]{'Transition':<12}  {'d1':>8}  {'d2':>8}  {'d3':>8}  {'d4':>8}     Total[/bold]")
+        for (old, new), counts in report.transitions.items():
+            label = f"{LEVEL_NAMES[old]} -> {LEVEL_NAMES[new]}"
+            cells = "  ".join(f"{count:>8}" for count in counts)
+            console.print(f"{label:<12}  {cells}  {sum(counts):>8}")
+        cells = "  ".join(f"{count:>8}" for count in report.by_difficulty())
+        console.print(f"{'Total':<12}  {cells}  {report.changed_rows:>8}")
+        console.print()
+
+    share = 100 * report.changed_rows / report.total_rows if report.total_rows else 0.0
+    console.print(f"[bold]Changed:[/bold] {report.changed_rows} of {report.total_rows} rows ({share:.2f}%)")
+    console.print(
+        f"[dim]Scanned {report.blocks_scanned}/{report.blocks_total} blocks "
+        f"in {report.elapsed:.3f}s[/dim]"
+    )
+
+
 if __name__ == "__main__":
     main()
@@ -15,6 +15,10 @@ Commands:
   :eval <rule> <signal>  - Evaluate rule against signal
   :test <signal>         - Test signal against loaded rules file
   :load <file>           - Load rules from file
+  :archive <dir>         - Open signal archive for queries
+  :query <expr>          - Query opened archive
+  :profile on|off        - Show per-phase timing after each command
+  :cache [N [lru|clock]] - Show classification cache metrics / resize cache
   :help                  - Show help
   :examples              - Show example rules
   :quit                  - Exit REPL
@@ -24,6 +28,8 @@ Examples:
   >>> :eval "E5 { d4: w3 & f3; }" w3,f3,t1,r1,a1,d4
   >>> :load data/rules.txt
   >>> :test w2,f2,t1,r1,a1,d3
+  >>> :archive store/
+  >>> :query E5 d4 from=2025-01-05T06:00 to=2025-01-05T09:00
 """
 
 import sys
@@ -35,6 +41,10 @@ from src.parser.rule_parser import parse_rules_string, parse_rules_file
 from src.parser.models import ThreatBlock, RulesDatabase
 from src.evaluator.threat_matcher import ThreatMatcher
 from src.evaluator.signal import parse_signal
+from src.evaluator.codes import LEVEL_NAMES
+from src.evaluator.memo import DEFAULT_CAPACITY, MemoizedMatcher
+from src.archive import ArchiveReader, parse_query
+from src.profiling import PhaseProfiler
 
 
 class ThreatRulesREPL:
@@ -43,6 +53,11 @@ class ThreatRulesREPL:
     def __init__(self):
         self.loaded_rules: Optional[RulesDatabase] = None
         self.rules_file: Optional[str] = None
+        self.matcher: Optional[MemoizedMatcher] = None
+        self.cache_capacity = DEFAULT_CAPACITY
+        self.cache_policy = 'lru'
+        self.archive: Optional[ArchiveReader] = None
+        self.profiler = PhaseProfiler(enabled=False)
         self.prompt = ">>> "
 
     def run(self):
@@ -121,9 +136,30 @@ class ThreatRulesREPL:
         elif cmd == ':show' or cmd == ':s':
             self.show_loaded_rules()
 
+        elif cmd == ':archive' or cmd == ':a':
+            if not args:
+                print("Usage: :archive <dir>")
+                print("Example: :archive store/")
+            else:
+                self.open_archive(args)
+
+        elif cmd == ':query' or cmd == ':qy':
+            self.query_archive(args)
+
+        elif cmd == ':cache' or cmd == ':c':
+            self.cache_command(args)
+
+        elif cmd == ':profile' or cmd == ':pr':
+            self.set_profiling(args)
+            return
+
         else:
             print(f"Unknown command: {cmd}")
             print("Type :help for available commands")
+            return
+
+        if self.profiler.enabled:
+            self.show_profile()
 
     def show_help(self):
         """Show help message"""
@@ -136,6 +172,12 @@ class ThreatRulesREPL:
         print("  :test <signal>         Test signal against loaded rules")
         print("  :load <file>           Load rules from file")
         print("  :show                  Show currently loaded rules")
+        print("  :archive <dir>         Open signal archive")
+        print("  :query <expr>          Query archive (e.g. E5 d4 from=... to=..., by=day)")
+        print("  :profile on [prefix]   Per-phase timing after each command")
+        print("                         (prefix: .pstats/.collapsed dumps of :load)")
+        print("  :profile off           Disable profiling")
+        print("  :cache [N [policy]]    Cache metrics; resize cache (policy: lru or clock)")
         print("  :examples              Show example rules")
         print("  :help                  Show this help message")
         print("  :quit                  Exit REPL")
@@ -146,6 +188,10 @@ class ThreatRulesREPL:
         print("  :t  = :test")
         print("  :l  = :load")
         print("  :s  = :show")
+        print("  :a  = :archive")
+        print("  :qy = :query")
+        print("  :pr = :profile")
+        print("  :c  = :cache")
         print("  :h  = :help")
         print("  :q  = :quit")
         print()
@@ -277,13 +323,14 @@ class ThreatRulesREPL:
 
         try:
             # Parse signal
-            signal = parse_signal(signal_text)
+            with self.profiler.phase('signal parsing'):
+                signal = parse_signal(signal_text)
             print(f"✓ Signal parsed: {signal}")
             print()
 
-            # Evaluate
-            matcher = ThreatMatcher(self.loaded_rules)
-            assessment = matcher.assess_threat(signal)
+            # Evaluate (memoised matcher built by :load)
+            with self.profiler.phase('classification'):
+                assessment = self.matcher.assess_threat(signal)
 
             print(f"Result: {assessment.threat_level.value}")
             print()
@@ -306,7 +353,7 @@ class ThreatRulesREPL:
                 return
 
             # Parse rules
-            rules_db = parse_rules_file(path)
+            rules_db = self.profiler.profile_rules_parse(parse_rules_file, path)
 
             if not rules_db or not rules_db.blocks:
                 print("✗ No rules parsed")
@@ -315,6 +362,15 @@ class ThreatRulesREPL:
             self.loaded_rules = rules_db
             self.rules_file = file_path
 
+            # New rules invalidate cached assessments
+            with self.profiler.phase('matcher compilation'):
+                if self.matcher is None:
+                    self.matcher = MemoizedMatcher(
+                        ThreatMatcher(rules_db), self.cache_capacity, self.cache_policy
+                    )
+                else:
+                    self.matcher.reload(rules_db)
+
             print(f"✓ Loaded {len(rules_db.blocks)} threat blocks")
 
             for block in rules_db.blocks.values():
@@ -345,6 +401,119 @@ class ThreatRulesREPL:
             print("}")
             print()
 
+    def open_archive(self, dir_path: str):
+        """Open signal archive for queries"""
+        print()
+        print(f"Opening archive: {dir_path}")
+        print("-" * 70)
+
+        try:
+            archive = ArchiveReader(dir_path)
+        except Exception as e:
+            print(f"✗ Error: {e}")
+            print()
+            return
+
+        if self.archive is not None:
+            self.archive.close()
+        self.archive = archive
+
+        print(f"✓ {archive.total_rows} rows in {len(archive.blocks)} blocks")
+        print(f"  Sources: {len(archive.sources)}, rules versions: {', '.join(archive.versions)}")
+        print()
+
+    def query_archive(self, query_text: str):
+        """Query opened archive"""
+        if self.archive is None:
+            print("No archive opened. Use :archive <dir> first.")
+            return
+
+        print()
+        print(f"Query: {query_text or '(all)'}")
+        print("-" * 70)
+
+        try:
+            query = parse_query(query_text)
+            result = self.archive.query(query)
+        except Exception as e:
+            print(f"✗ Error: {e}")
+            print()
+            return
+
+        if query.group_by:
+            for group, counts in result.groups.items():
+                cells = "  ".join(f"{LEVEL_NAMES[code]}: {counts[code]}" for code in range(1, len(LEVEL_NAMES)))
+                print(f"  {group}  {cells}")
+        else:
+            for row in result.rows:
+                print(f"  {row}")
+            if result.total > len(result.rows):
+                print(f"  ... {result.total - len(result.rows)} more")
+
+        print()
+        print(f"Matching rows: {result.total} "
+              f"(scanned {result.blocks_scanned}/{result.blocks_total} blocks, {result.elapsed:.3f}s)")
+        print()
+
+    def cache_command(self, args: str):
+        """Show cache metrics or resize the cache"""
+        parts = args.split()
+
+        if parts:
+            try:
+                capacity = int(parts[0])
+                policy = parts[1].lower() if len(parts) > 1 else self.cache_policy
+                if self.loaded_rules is not None:
+                    self.matcher = MemoizedMatcher(
+                        ThreatMatcher(self.loaded_rules), capacity, policy
+                    )
+                elif capacity <= 0 or policy not in ('lru', 'clock'):
+                    raise ValueError("Usage: :cache <capacity> [lru|clock]")
+            except ValueError as e:
+                print(f"✗ Error: {e}")
+                return
+            self.cache_capacity, self.cache_policy = capacity, policy
+            print(f"✓ Cache: capacity {capacity}, policy {policy}")
+            return
+
+        if self.matcher is None:
+            print(f"Cache: capacity {self.cache_capacity}, policy {self.cache_policy} (no rules loaded)")
+        else:
+            print(f"Cache ({self.matcher.policy}): {self.matcher.stats}")
+
+    def set_profiling(self, args: str):
+        """Enable or disable per-phase profiling"""
+        parts = args.split()
+        mode = parts[0].lower() if parts else ""
+
+        if mode == 'on':
+            prefix = parts[1] if len(parts) > 1 else None
+            self.profiler = PhaseProfiler(enabled=True, output_prefix=prefix)
+            print("Profiling enabled" + (f" (dumps: {prefix}.pstats/.collapsed)" if prefix else ""))
+        elif mode == 'off':
+            self.profiler = PhaseProfiler(enabled=False)
+            print("Profiling disabled")
+        else:
+            state = "on" if self.profiler.enabled else "off"
+            print(f"Profiling is {state}. Usage: :profile on [prefix] | :profile off")
+
+    def show_profile(self):
+        """Print phase timing of the last command and start a fresh measurement"""
+        # Single-signal commands are too short to profile; only rules
+        # loading runs an instrumented pass and writes dumps
+        pstats_path, collapsed_path = self.profiler.write_dumps()
+
+        if self.profiler.wall:
+            print("Profile:")
+            print(self.profiler.format_report())
+            if pstats_path:
+                print(f"cProfile dump: {pstats_path}")
+            if collapsed_path:
+                print(f"Collapsed stacks: {collapsed_path}")
+            print()
+
+        self.profiler = PhaseProfiler(enabled=True, output_prefix=self.profiler.output_prefix)
+
     def _expr_to_string(self, expr) -> str:
         """Convert expression AST to string"""
         from src.parser.models import LogicalExpression
@@ -7,16 +7,33 @@ and validates the results against expected values.
 
 Usage:
     python run_tests.py
+    python run_tests.py --profile
+    python run_tests.py --profile --profile-out prof/tests
+    python run_tests.py --replay-traffic traffic.txt.gz --cache-sizes 16,64,256,1024
 """
 
+import time
+
+# Start of the 'imports' phase reported by --profile
+_IMPORTS_STARTED = (time.perf_counter(), time.process_time())
+
+import argparse
 from pathlib import Path
 from src.parser.rule_parser import parse_rules_file
 from src.evaluator.threat_matcher import ThreatMatcher
 from src.evaluator.signal import parse_signal
+from src.evaluator.memo import POLICIES, MemoizedMatcher
+from src.input_sources import expand_sources, iter_signal_lines
+from src.time_windows import split_timestamp
+from src.profiling import PhaseProfiler
+
+_IMPORTS_FINISHED = (time.perf_counter(), time.process_time())
 
 
-def run_comprehensive_tests():
+def run_comprehensive_tests(profiler: PhaseProfiler = None):
     """Run all tests from test_signals_comprehensive.txt"""
+    if profiler is None:
+        profiler = PhaseProfiler(enabled=False)
 
     # Load rules
     print("="  * 80)
@@ -30,8 +47,9 @@ def run_comprehensive_tests():
         return
 
     print(f"Loading rules from: {rules_path}")
-    rules_db = parse_rules_file(rules_path)
-    matcher = ThreatMatcher(rules_db)
+    rules_db = profiler.profile_rules_parse(parse_rules_file, rules_path)
+    with profiler.phase('matcher compilation'):
+        matcher = ThreatMatcher(rules_db)
     print(f"[OK] Loaded {len(rules_db.blocks)} threat blocks")
     print()
 
@@ -47,7 +65,7 @@ def run_comprehensive_tests():
     # Parse test cases
     test_cases = []
     with open(test_file, 'r', encoding='utf-8') as f:
-        for line_no, line in enumerate(f, 1):
+        for line_no, line in enumerate(profiler.timed_iter(f, 'input reading'), 1):
             line = line.strip()
 
             # Skip comments and empty lines
@@ -72,6 +90,7 @@ def run_comprehensive_tests():
 
     print(f"[OK] Loaded {len(test_cases)} test cases")
     print()
+
     print("="  * 80)
     print("RUNNING TESTS")
     print("=" * 80)
@@ -98,10 +117,12 @@ def run_comprehensive_tests():
 
         try:
             # Parse signal
-            signal = parse_signal(signal_str)
+            with profiler.phase('signal parsing'):
+                signal = parse_signal(signal_str)
 
             # Evaluate
-            assessment = matcher.assess_threat(signal)
+            with profiler.phase('classification'):
+                assessment = matcher.assess_threat(signal)
             actual = assessment.threat_level.value
 
             # Check result (BEFORE printing)
@@ -120,11 +141,12 @@ def run_comprehensive_tests():
                 })
 
             # Print result (encoding errors won't affect test counts)
-            try:
-                print(f"{status} | {signal_str} => {expected} | {description}")
-            except UnicodeEncodeError:
-                # Fallback for encoding issues
-                print(f"{status} | {signal_str} => {expected} | [description omitted]")
+            with profiler.phase('output'):
+                try:
+                    print(f"{status} | {signal_str} => {expected} | {description}")
+                except UnicodeEncodeError:
+                    # Fallback for encoding issues
+                    print(f"{status} | {signal_str} => {expected} | [description omitted]")
 
         except Exception as e:
             # Only count as failure if evaluation itself failed
@@ -172,9 +194,115 @@ def run_comprehensive_tests():
     return passed, failed
 
 
+def show_profile(profiler: PhaseProfiler):
+    """Print phase timing; with --profile-out rerun the tests under cProfile for dumps"""
+    profiler.record(run_comprehensive_tests, profiler)
+    pstats_path, collapsed_path = profiler.write_dumps()
+
+    print("=" * 80)
+    print("PROFILE")
+    print("=" * 80)
+    print()
+    print(profiler.format_report())
+    if pstats_path:
+        print(f"cProfile dump: {pstats_path}")
+    if collapsed_path:
+        print(f"Collapsed stacks: {collapsed_path}")
+    print()
+
+
+def run_cache_replay(traffic_spec, capacities, policies):
+    """Replay recorded traffic through the memo cache for each capacity/policy"""
+
+    print("=" * 80)
+    print("CACHE REPLAY - Mountain Monitor classification cache")
+    print("=" * 80)
+    print()
+
+    rules_path = Path("data/rules.txt")
+    rules_db = parse_rules_file(rules_path)
+    sources = expand_sources(traffic_spec)
+    print(f"Rules:   {rules_path}")
+    print(f"Traffic: {', '.join(sources)}")
+    print()
+
+    # Read once: stdin cannot be replayed, and every run must see the same lines
+    lines = list(iter_signal_lines(sources))
+
+    def replay(classify):
+        # Both paths validate with parse_signal (assess_text parses on misses)
+        started = time.perf_counter()
+        signals = errors = 0
+        for line in lines:
+            try:
+                classify(split_timestamp(line)[1])
+                signals += 1
+            except ValueError:
+                errors += 1
+        return signals, errors, time.perf_counter() - started
+
+    # Baseline without cache
+    matcher = ThreatMatcher(rules_db)
+    signals, errors, baseline = replay(lambda text: matcher.assess_threat(parse_signal(text)))
+    print(f"Signals: {signals} ({errors} invalid)")
+    print(f"No cache: {baseline:.3f}s ({signals / baseline if baseline else 0:.0f} signals/s)")
+    print()
+
+    print(f"{'Policy':<7} {'Capacity':>9} {'Hit rate':>9} {'Evictions':>10} {'Size':>7} {'Time (s)':>9} {'Speedup':>8}")
+    print("-" * 65)
+
+    for policy in policies:
+        for capacity in capacities:
+            cached = MemoizedMatcher(ThreatMatcher(rules_db), capacity, policy)
+            _, _, elapsed = replay(cached.assess_text)
+            stats = cached.stats
+            speedup = baseline / elapsed if elapsed else 0.0
+            print(
+                f"{policy:<7} {capacity:>9} {100 * stats.hit_rate:>8.1f}% "
+                f"{stats.evictions:>10} {stats.size:>7} {elapsed:>9.3f} {speedup:>7.2f}x"
+            )
+
+    print()
+
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run comprehensive threat rule tests")
+    parser.add_argument('--profile', action='store_true',
+                        help='Report wall-clock and CPU time per phase')
+    parser.add_argument('--profile-out', metavar='PREFIX',
+                        help='Write PREFIX.pstats and PREFIX.collapsed (flamegraph)')
+    parser.add_argument('--replay-traffic', metavar='SIGNALS',
+                        help='Replay recorded signals (file, glob, directory or -) '
+                             'through the classification cache instead of running tests')
+    parser.add_argument('--cache-sizes', default='16,64,256,1024',
+                        help='Cache capacities for --replay-traffic (default: 16,64,256,1024)')
+    parser.add_argument('--cache-policy', choices=POLICIES,
+                        help='Only replay this policy (default: all)')
+    args = parser.parse_args()
+
+    if args.replay_traffic:
+        try:
+            run_cache_replay(
+                args.replay_traffic,
+                [int(size) for size in args.cache_sizes.split(',')],
+                [args.cache_policy] if args.cache_policy else list(POLICIES)
+            )
+            exit(0)
+        except Exception as e:
+            print(f"[FAIL] Fatal error: {e}")
+            exit(2)
+
+    profiler = PhaseProfiler(enabled=args.profile, output_prefix=args.profile_out)
+    profiler.add(
+        'imports',
+        _IMPORTS_FINISHED[0] - _IMPORTS_STARTED[0],
+        _IMPORTS_FINISHED[1] - _IMPORTS_STARTED[1]
+    )
+
     try:
-        passed, failed = run_comprehensive_tests()
+        passed, failed = run_comprehensive_tests(profiler)
+        if profiler.enabled:
+            show_profile(profiler)
 
         # Exit with appropriate code
         if failed > 0:
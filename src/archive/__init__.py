@@ -0,0 +1,23 @@
+"""Columnar archive of assessed signals"""
+
+from src.archive.store import (
+    ArchiveQuery,
+    ArchiveReader,
+    ArchiveRow,
+    ArchiveWriter,
+    QueryResult,
+    load_code_counts,
+    parse_query,
+    rules_version,
+)
+
+__all__ = [
+    'ArchiveQuery',
+    'ArchiveReader',
+    'ArchiveRow',
+    'ArchiveWriter',
+    'QueryResult',
+    'load_code_counts',
+    'parse_query',
+    'rules_version',
+]
@@ -0,0 +1,698 @@
+"""
+Columnar archive of assessed signals
+=====================================
+
+Append-only on-disk archive of (timestamp, source id, signal code, level,
+rules version) rows. An archive is a directory:
+
+    signals.mma        column blocks, appended only
+    meta.json          source names and rules versions (id -> name)
+    rules/<ver>.txt    snapshot of every rules file used for archiving
+    counts/<ver>.bin   uint64 row count per signal code for each rules version
+
+Each block is a fixed header followed by its columns:
+
+    header   magic, row count, min/max timestamp, level bitmap (bits 1-5),
+             difficulty bitmap (bits 1-4), flags, signal code bitmap
+             (1620 bits); flag bit 0 marks non-decreasing timestamps
+    columns  int64 timestamps | uint32 source ids | uint16 signal codes |
+             uint16 rules versions | uint8 levels       (little-endian)
+
+Queries test block headers first and skip blocks that cannot match
+(time range, level, difficulty or signal code), then scan the remaining
+columns through a read-only memory map. Without row filters, level totals
+come from bytes.count on the level column; in blocks with sorted
+timestamps the time range and the day/hour groups are located by bisection,
+so by=day/by=hour never loops over rows in Python.
+
+A block is written with a single write, so a crash can only leave a torn
+block at the end of the data file; readers stop there and a new writer
+truncates it before appending.
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+import time
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from src.evaluator.codes import (
+    DIFFICULTIES, LEVEL_CODES, LEVEL_NAMES, SIGNAL_SPACE,
+    decode_signal, encode_signal, level_code, signal_difficulty
+)
+
+
+DATA_FILE = "signals.mma"
+META_FILE = "meta.json"
+RULES_DIR = "rules"
+COUNTS_DIR = "counts"
+
+BLOCK_MAGIC = b"MMA1"
+DEFAULT_BLOCK_ROWS = 65536
+
+_HEADER = struct.Struct('<4sIqqBBH')
+BLOCK_SORTED = 0x1      # header flag: timestamps are non-decreasing
+_CODE_BITMAP_BYTES = (SIGNAL_SPACE + 7) // 8 + 1     # padded so header is 8-aligned
+HEADER_SIZE = _HEADER.size + _CODE_BITMAP_BYTES
+
+# (typecode, item size) in on-disk column order
+_COLUMNS = (('q', 8), ('I', 4), ('H', 2), ('H', 2), ('B', 1))
+_ROW_BYTES = sum(size for _, size in _COLUMNS)
+
+_LITTLE_ENDIAN = sys.byteorder == 'little'
+
+
+def _padded(size: int) -> int:
+    return (size + 7) & ~7
+
+
+def _block_size(count: int) -> int:
+    return _padded(HEADER_SIZE + count * _ROW_BYTES)
+
+
+def _complete_length(data_path: Path) -> int:
+    """End offset of the last complete block in a data file"""
+    end = 0
+    with open(data_path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        while end + HEADER_SIZE <= size:
+            f.seek(end)
+            magic, count = _HEADER.unpack(f.read(_HEADER.size))[:2]
+            if magic != BLOCK_MAGIC or end + _block_size(count) > size:
+                break
+            end += _block_size(count)
+    return end
+
+
+def _bit_mask(values) -> int:
+    mask = 0
+    for value in values:
+        mask |= 1 << value
+    return mask
+
+
+@dataclass
+class ArchiveRow:
+    """Single archived assessment"""
+    timestamp: int
+    source: str
+    code: int
+    level: int
+    rules_version: str
+
+    @property
+    def signal(self) -> str:
+        return decode_signal(self.code)
+
+    @property
+    def level_name(self) -> str:
+        return LEVEL_NAMES[self.level]
+
+    @property
+    def difficulty(self) -> int:
+        return signal_difficulty(self.code)
+
+    def __str__(self):
+        stamp = datetime.fromtimestamp(self.timestamp).isoformat(sep=' ')
+        return f"{stamp}  {self.signal}  {self.level_name}  [{self.source}, rules {self.rules_version}]"
+
+
+def rules_version(rules_text: str) -> str:
+    """Short content hash identifying a rules file version"""
+    return hashlib.sha256(rules_text.encode('utf-8')).hexdigest()[:12]
+
+
+def load_code_counts(path, version: str) -> Optional[array]:
+    """Pre-aggregated row counts per signal code for a rules version"""
+    counts_path = Path(path) / COUNTS_DIR / f"{version}.bin"
+    if not counts_path.exists():
+        return None
+    counts = array('Q')
+    counts.frombytes(counts_path.read_bytes())
+    if not _LITTLE_ENDIAN:
+        counts.byteswap()
+    return counts
+
+
+def _save_code_counts(path: Path, version: str, counts: array):
+    counts_dir = path / COUNTS_DIR
+    counts_dir.mkdir(exist_ok=True)
+    data = array('Q', counts)
+    if not _LITTLE_ENDIAN:
+        data.byteswap()
+    (counts_dir / f"{version}.bin").write_bytes(data.tobytes())
+
+
+def release_columns(columns):
+    """Release memory-mapped column views so the reader can be closed"""
+    for column in columns:
+        if isinstance(column, memoryview):
+            column.release()
+
+
+def _load_meta(path: Path) -> Dict:
+    meta_path = path / META_FILE
+    if meta_path.exists():
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    return {'sources': [], 'versions': []}
+
+
+class ArchiveWriter:
+    """
+    Append assessed signals to an archive.
+
+    Rows are buffered in column arrays and written as one block every
+    `block_rows` rows (and on close).
+    """
+
+    def __init__(
+        self,
+        path,
+        rules_version: str,
+        rules_text: Optional[str] = None,
+        block_rows: int = DEFAULT_BLOCK_ROWS
+    ):
+        """
+        Args:
+            path: Archive directory (created if missing)
+            rules_version: Identifier of the rules used for assessment
+            rules_text: Rules file content, stored once per version for replay
+            block_rows: Rows per block
+        """
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.block_rows = block_rows
+
+        self._meta = _load_meta(self.path)
+        self._source_ids = {name: i for i, name in enumerate(self._meta['sources'])}
+        self._version_id = self._intern(self._meta['versions'], rules_version)
+        self._version = rules_version
+        self._code_counts = load_code_counts(self.path, rules_version)
+        if self._code_counts is None:
+            self._code_counts = array('Q', bytes(8 * SIGNAL_SPACE))
+
+        if rules_text is not None:
+            rules_dir = self.path / RULES_DIR
+            rules_dir.mkdir(exist_ok=True)
+            snapshot = rules_dir / f"{rules_version}.txt"
+            if not snapshot.exists():
+                snapshot.write_text(rules_text, encoding='utf-8')
+
+        data_path = self.path / DATA_FILE
+        if data_path.exists():
+            complete = _complete_length(data_path)
+            if complete < data_path.stat().st_size:
+                # Drop a torn block left by an interrupted writer, otherwise
+                # readers would stop there and miss every block appended now
+                os.truncate(data_path, complete)
+
+        self._file = open(data_path, 'ab')
+        self._reset()
+        self.rows_written = 0
+        self.blocks_written = 0
+
+    @staticmethod
+    def _intern(table: List[str], name: str) -> int:
+        if name not in table:
+            table.append(name)
+        return table.index(name)
+
+    def _reset(self):
+        self._sorted = True
+        self._timestamps = array('q')
+        self._sources = array('I')
+        self._codes = array('H')
+        self._versions = array('H')
+        self._levels = array('B')
+
+    def source_id(self, name: str) -> int:
+        """Id of a source name (registered on first use)"""
+        source_id = self._source_ids.get(name)
+        if source_id is None:
+            source_id = self._intern(self._meta['sources'], name)
+            self._source_ids[name] = source_id
+        return source_id
+
+    def append(self, timestamp: float, source_id: int, code: int, level: int):
+        """Append one row; flushes a block when full"""
+        timestamp = int(timestamp)
+        if self._timestamps and timestamp < self._timestamps[-1]:
+            self._sorted = False        # late signal
+        self._timestamps.append(timestamp)
+        self._sources.append(source_id)
+        self._codes.append(code)
+        self._versions.append(self._version_id)
+        self._levels.append(level)
+
+        if len(self._codes) >= self.block_rows:
+            self.flush()
+
+    def flush(self):
+        """Write buffered rows as one block"""
+        count = len(self._codes)
+        if not count:
+            return
+
+        level_bits = _bit_mask(set(self._levels))
+        difficulty_bits = _bit_mask({signal_difficulty(c) for c in set(self._codes)})
+        code_bitmap = bytearray(_CODE_BITMAP_BYTES)
+        for code in set(self._codes):
+            code_bitmap[code >> 3] |= 1 << (code & 7)
+
+        columns = [self._timestamps, self._sources, self._codes, self._versions, self._levels]
+        if not _LITTLE_ENDIAN:
+            for column in columns:
+                column.byteswap()
+
+        block = bytearray(_HEADER.pack(
+            BLOCK_MAGIC, count, min(self._timestamps), max(self._timestamps),
+            level_bits, difficulty_bits, BLOCK_SORTED if self._sorted else 0
+        ))
+        block += code_bitmap
+        for column in columns:
+            block += column.tobytes()
+        block += bytes(_padded(len(block)) - len(block))
+
+        # Single write per block - a torn trailing block is ignored by readers;
+        # metadata goes first so every written row resolves its source/version
+        self._write_meta()
+        self._file.write(block)
+        self._file.flush()
+
+        for code, n in Counter(self._codes).items():
+            self._code_counts[code] += n
+        _save_code_counts(self.path, self._version, self._code_counts)
+
+        self.rows_written += count
+        self.blocks_written += 1
+        self._reset()
+
+    def _write_meta(self):
+        with open(self.path / META_FILE, 'w', encoding='utf-8') as f:
+            json.dump(self._meta, f, indent=2)
+
+    def close(self):
+        self.flush()
+        self._file.close()
+        self._write_meta()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+@dataclass
+class BlockInfo:
+    """Parsed block header"""
+    offset: int
+    count: int
+    min_ts: int
+    max_ts: int
+    level_bits: int
+    difficulty_bits: int
+    code_bitmap: bytes
+    version: int        # rules version id (one writer session per block)
+    flags: int = 0
+
+    @property
+    def sorted(self) -> bool:
+        return bool(self.flags & BLOCK_SORTED)
+
+    def has_code(self, code: int) -> bool:
+        return bool(self.code_bitmap[code >> 3] & (1 << (code & 7)))
+
+
+@dataclass
+class ArchiveQuery:
+    """Filter over archived rows; None means no restriction"""
+    start: Optional[int] = None          # inclusive epoch seconds
+    end: Optional[int] = None            # exclusive epoch seconds
+    levels: Optional[Set[int]] = None
+    difficulties: Optional[Set[int]] = None
+    codes: Optional[Set[int]] = None
+    sources: Optional[Set[str]] = None
+    group_by: Optional[str] = None       # 'day' or 'hour' for histograms
+    limit: int = 20
+
+    def matches_block(self, block: BlockInfo) -> bool:
+        if self.start is not None and block.max_ts < self.start:
+            return False
+        if self.end is not None and block.min_ts >= self.end:
+            return False
+        if self.levels is not None and not block.level_bits & _bit_mask(self.levels):
+            return False
+        if self.difficulties is not None and not block.difficulty_bits & _bit_mask(self.difficulties):
+            return False
+        if self.codes is not None and not any(block.has_code(c) for c in self.codes):
+            return False
+        return True
+
+    def covers_block(self, block: BlockInfo) -> bool:
+        """True if every row of the block passes the time filter"""
+        return (
+            (self.start is None or block.min_ts >= self.start)
+            and (self.end is None or block.max_ts < self.end)
+        )
+
+
+def _parse_time(text: str) -> int:
+    try:
+        return int(float(text))
+    except ValueError:
+        return int(datetime.fromisoformat(text).timestamp())
+
+
+def parse_query(text: str) -> ArchiveQuery:
+    """
+    Parse query expression.
+
+    Tokens (space separated, all optional):
+        E5 / E4+ / level=E4,E5     threat levels
+        d4 / d=3,4                 trail difficulties
+        w3,f3,t1,r1,a1,d4          exact signal
+        from=2025-01-05T06:00      start time (inclusive, ISO-8601 or epoch)
+        to=2025-01-05T09:00        end time (exclusive)
+        source=<name>              input source
+        by=day / by=hour           level histogram per day / hour
+        limit=N                    rows to list (default 20)
+
+    Example:
+        E5 d4 from=2025-01-05T06:00 to=2025-01-05T09:00
+    """
+    query = ArchiveQuery()
+
+    for token in text.split():
+        key, sep, value = token.partition('=')
+        key = key.lower()
+
+        if not sep:
+            upper = token.upper()
+            if upper.endswith('+') and upper[:-1] in LEVEL_CODES:
+                query.levels = set(range(LEVEL_CODES[upper[:-1]], len(LEVEL_NAMES)))
+            elif upper in LEVEL_CODES:
+                query.levels = (query.levels or set()) | {LEVEL_CODES[upper]}
+            elif len(token) == 2 and key[0] == 'd' and key[1] in '1234':
+                query.difficulties = (query.difficulties or set()) | {int(key[1])}
+            elif ',' in token:
+                query.codes = (query.codes or set()) | {encode_signal(token)}
+            else:
+                raise ValueError(f"Unknown query token: {token!r}")
+        elif key in ('level', 'levels'):
+            query.levels = {level_code(v.upper()) for v in value.split(',')}
+        elif key in ('d', 'difficulty'):
+            query.difficulties = {int(v.lstrip('d')) for v in value.split(',')}
+        elif key == 'signal':
+            query.codes = {encode_signal(value)}
+        elif key == 'from':
+            query.start = _parse_time(value)
+        elif key == 'to':
+            query.end = _parse_time(value)
+        elif key == 'source':
+            query.sources = set(value.split(','))
+        elif key == 'by':
+            if value not in ('day', 'hour'):
+                raise ValueError(f"Unsupported grouping: {value!r} (use day or hour)")
+            query.group_by = value
+        elif key == 'limit':
+            query.limit = int(value)
+        else:
+            raise ValueError(f"Unknown query key: {key!r}")
+
+    return query
+
+
+@dataclass
+class QueryResult:
+    """Outcome of an archive query"""
+    total: int = 0
+    level_counts: List[int] = field(default_factory=lambda: [0] * len(LEVEL_NAMES))
+    groups: Dict[str, List[int]] = field(default_factory=dict)
+    rows: List[ArchiveRow] = field(default_factory=list)
+    blocks_total: int = 0
+    blocks_scanned: int = 0
+    elapsed: float = 0.0
+
+
+class ArchiveReader:
+    """Memory-mapped reader for archive queries"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        data_path = self.path / DATA_FILE
+        if not data_path.exists():
+            raise FileNotFoundError(f"Archive not found: {path}")
+
+        meta = _load_meta(self.path)
+        self.sources: List[str] = meta['sources']
+        self.versions: List[str] = meta['versions']
+
+        self._file = open(data_path, 'rb')
+        size = data_path.stat().st_size
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        self.blocks = self._read_index()
+
+    def _read_index(self) -> List[BlockInfo]:
+        blocks = []
+        offset = 0
+        size = len(self._map)
+
+        while offset + HEADER_SIZE <= size:
+            magic, count, min_ts, max_ts, level_bits, difficulty_bits, flags = \
+                _HEADER.unpack_from(self._map, offset)
+            if magic != BLOCK_MAGIC:
+                break
+
+            block_size = _block_size(count)
+            if offset + block_size > size:
+                break   # torn trailing block
+
+            bitmap_start = offset + _HEADER.size
+            blocks.append(BlockInfo(
+                offset, count, min_ts, max_ts, level_bits, difficulty_bits,
+                bytes(self._map[bitmap_start:bitmap_start + _CODE_BITMAP_BYTES]),
+                self._block_version(offset, count), flags
+            ))
+            offset += block_size
+
+        return blocks
+
+    def _block_version(self, offset: int, count: int) -> int:
+        # First entry of the versions column (after timestamps, sources, codes)
+        position = offset + HEADER_SIZE + count * (8 + 4 + 2)
+        return struct.unpack_from('<H', self._map, position)[0]
+
+    def columns(self, block: BlockInfo):
+        """
+        (timestamps, sources, codes, versions, levels) column views of a block.
+
+        Views point into the memory map; pass them to release_columns()
+        when done, the reader cannot be closed while they are alive.
+        """
+        offset = block.offset + HEADER_SIZE
+        result = []
+        for typecode, size in _COLUMNS:
+            length = block.count * size
+            view = memoryview(self._map)[offset:offset + length]
+            if _LITTLE_ENDIAN:
+                result.append(view.cast(typecode))
+            else:
+                column = array(typecode, view.tobytes())
+                column.byteswap()
+                result.append(column)
+            offset += length
+        return tuple(result)
+
+    @property
+    def total_rows(self) -> int:
+        return sum(block.count for block in self.blocks)
+
+    def iter_rows(self, query: ArchiveQuery) -> Iterator[ArchiveRow]:
+        """Yield all rows matching the query"""
+        source_ids = self.source_ids_for(query)
+
+        for block in self.blocks:
+            if not query.matches_block(block):
+                continue
+            columns = self.columns(block)
+            timestamps, sources, codes, versions, levels = columns
+            try:
+                for i in range(block.count):
+                    if self.row_matches(query, source_ids, timestamps[i], sources[i],
+                                        codes[i], levels[i]):
+                        yield ArchiveRow(
+                            timestamps[i], self.sources[sources[i]], codes[i],
+                            levels[i], self.versions[versions[i]]
+                        )
+            finally:
+                release_columns(columns)
+
+    def query(self, query: ArchiveQuery) -> QueryResult:
+        """Run query: level totals, optional per day/hour histogram and first rows"""
+        started = time.perf_counter()
+        result = QueryResult(blocks_total=len(self.blocks))
+        source_ids = self.source_ids_for(query)
+        row_filter = (
+            query.levels is not None or query.difficulties is not None
+            or query.codes is not None or source_ids is not None
+        )
+        group_of, group_end = self._grouper(query.group_by) if query.group_by else (None, None)
+
+        for block in self.blocks:
+            if not query.matches_block(block):
+                continue
+            result.blocks_scanned += 1
+            columns = self.columns(block)
+            timestamps, sources, codes, versions, levels = columns
+            try:
+                # Fast path: level totals from bytes.count on the level column,
+                # one count per group segment
+                segments = None
+                if not row_filter:
+                    segments = self._segments(block, timestamps, query, group_of, group_end)
+                if segments is not None:
+                    for group, start, stop in segments:
+                        level_bytes = levels[start:stop].tobytes()
+                        counts = [level_bytes.count(level) for level in range(len(LEVEL_NAMES))]
+                        self._count(result, counts, group)
+                    first = segments[0][1] if segments else 0
+                    last = segments[-1][2] if segments else 0
+                    matching = range(first, min(last, first + query.limit - len(result.rows)))
+                else:
+                    matching = []
+                    for i in range(block.count):
+                        level = levels[i]
+                        if not self.row_matches(query, source_ids, timestamps[i],
+                                                sources[i], codes[i], level):
+                            continue
+                        result.total += 1
+                        result.level_counts[level] += 1
+                        if group_of:
+                            group = result.groups.get(group_of(timestamps[i]))
+                            if group is None:
+                                group = result.groups[group_of(timestamps[i])] = [0] * len(LEVEL_NAMES)
+                            group[level] += 1
+                        if len(result.rows) + len(matching) < query.limit:
+                            matching.append(i)
+
+                for i in matching:
+                    result.rows.append(ArchiveRow(
+                        timestamps[i], self.sources[sources[i]], codes[i], levels[i],
+                        self.versions[versions[i]]
+                    ))
+            finally:
+                release_columns(columns)
+
+        result.groups = dict(sorted(result.groups.items()))
+        result.elapsed = time.perf_counter() - started
+        return result
+
+    @staticmethod
+    def _segments(block, timestamps, query, group_of, group_end) -> Optional[List[Tuple]]:
+        """
+        (group, start, stop) row ranges of a block that pass the time filter,
+        split at group boundaries; None if rows must be checked one by one
+        """
+        if query.covers_block(block) and (
+                group_of is None or group_of(block.min_ts) == group_of(block.max_ts)):
+            return [(group_of(block.min_ts) if group_of else None, 0, block.count)]
+        if not block.sorted:
+            return None
+
+        start = 0 if query.start is None else bisect_left(timestamps, query.start)
+        stop = block.count if query.end is None else bisect_left(timestamps, query.end)
+        if group_of is None:
+            return [(None, start, stop)]
+
+        segments = []
+        while start < stop:
+            ts = timestamps[start]
+            end = bisect_left(timestamps, group_end(ts), start, stop)
+            segments.append((group_of(ts), start, end))
+            start = end
+        return segments
+
+    @staticmethod
+    def _count(result: QueryResult, counts: List[int], group: Optional[str]):
+        result.total += sum(counts)
+        for level, count in enumerate(counts):
+            result.level_counts[level] += count
+        if group is not None:
+            totals = result.groups.setdefault(group, [0] * len(LEVEL_NAMES))
+            for level, count in enumerate(counts):
+                totals[level] += count
+
+    @staticmethod
+    def row_matches(query, source_ids, ts, source, code, level) -> bool:
+        if query.start is not None and ts < query.start:
+            return False
+        if query.end is not None and ts >= query.end:
+            return False
+        if query.levels is not None and level not in query.levels:
+            return False
+        if query.difficulties is not None and code % DIFFICULTIES + 1 not in query.difficulties:
+            return False
+        if query.codes is not None and code not in query.codes:
+            return False
+        if source_ids is not None and source not in source_ids:
+            return False
+        return True
+
+    def source_ids_for(self, query: ArchiveQuery) -> Optional[Set[int]]:
+        if query.sources is None:
+            return None
+        return {i for i, name in enumerate(self.sources) if name in query.sources}
+
+    @staticmethod
+    def _grouper(group_by: str):
+        """
+        (group_of, group_end) for local day/hour labels, cached per quarter-hour.
+
+        group_of maps a timestamp to its label, group_end gives the first
+        timestamp after it with a different label. UTC offsets are whole
+        quarter-hours (+05:30, +05:45, ...), so local hour and day boundaries
+        never fall inside a 15-minute UTC slot.
+        """
+        fmt = '%Y-%m-%d %H:00' if group_by == 'hour' else '%Y-%m-%d'
+        labels: Dict[int, str] = {}
+
+        def slot_label(slot: int) -> str:
+            label = labels.get(slot)
+            if label is None:
+                label = labels[slot] = datetime.fromtimestamp(slot * 900).strftime(fmt)
+            return label
+
+        def group_of(ts: int) -> str:
+            return slot_label(ts // 900)
+
+        def group_end(ts: int) -> int:
+            slot = ts // 900
+            label = slot_label(slot)
+            slot += 1
+            while slot_label(slot) == label:
+                slot += 1
+            return slot * 900
+
+        return group_of, group_end
+
+    def close(self):
+        if isinstance(self._map, mmap.mmap):
+            self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
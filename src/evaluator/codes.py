@@ -0,0 +1,177 @@
+"""
+Compact integer codes for signals and threat levels
+====================================================
+
+The signal alphabet w[1-3],f[1-3],t[1-3],r[1-3],a[1-5],d[1-4] is finite
+(3*3*3*3*5*4 = 1620 combinations), so every signal maps to a small integer
+code and every threat level to a 1-byte code. Codes are used by columnar
+result batches, the archive and the replay tooling instead of full objects.
+
+Signal code layout (mixed radix, d is the least significant digit):
+
+    code = ((((w*3 + f)*3 + t)*3 + r)*5 + a)*4 + d      (all values 0-based)
+"""
+
+from typing import Dict, Tuple
+
+
+# (parameter, number of values) in canonical signal order
+SIGNAL_PARAMS: Tuple[Tuple[str, int], ...] = (
+    ('w', 3),
+    ('f', 3),
+    ('t', 3),
+    ('r', 3),
+    ('a', 5),
+    ('d', 4),
+)
+
+SIGNAL_SPACE = 1
+for _, _size in SIGNAL_PARAMS:
+    SIGNAL_SPACE *= _size
+
+DIFFICULTIES = 4
+
+# Level code 0 is reserved for "not assessed"; E1..E5 map to 1..5
+LEVEL_NAMES: Tuple[str, ...] = ('', 'E1', 'E2', 'E3', 'E4', 'E5')
+LEVEL_CODES: Dict[str, int] = {name: code for code, name in enumerate(LEVEL_NAMES) if name}
+UNASSESSED = 0
+
+
+def _build_tables():
+    texts = []
+    values = []
+    for code in range(SIGNAL_SPACE):
+        rest = code
+        digits = []
+        for _, size in reversed(SIGNAL_PARAMS):
+            digits.append(rest % size + 1)
+            rest //= size
+        digits.reverse()
+        values.append(tuple(digits))
+        texts.append(','.join(
+            f"{name}{value}" for (name, _), value in zip(SIGNAL_PARAMS, digits)
+        ))
+    return tuple(texts), tuple(values)
+
+
+# Canonical text ("w1,f1,t1,r1,a1,d1") and value tuple for every code
+SIGNAL_TEXTS, SIGNAL_VALUES = _build_tables()
+_CODE_BY_TEXT: Dict[str, int] = {text: code for code, text in enumerate(SIGNAL_TEXTS)}
+_CODE_BY_VALUES: Dict[Tuple[int, ...], int] = {
+    values: code for code, values in enumerate(SIGNAL_VALUES)
+}
+
+
+def canonical_signal(text: str) -> str:
+    """Normalize signal text: lowercase, no whitespace"""
+    return ''.join(text.split()).lower()
+
+
+def encode_signal(text: str) -> int:
+    """
+    Convert signal text to its integer code.
+
+    Args:
+        text: Signal in format w1,f1,t1,r1,a1,d1
+
+    Returns:
+        Code in range 0..SIGNAL_SPACE-1
+
+    Raises:
+        ValueError: If text is not a valid signal
+    """
+    code = _CODE_BY_TEXT.get(text)
+    if code is not None:
+        return code
+
+    code = _CODE_BY_TEXT.get(canonical_signal(text))
+    if code is None:
+        raise ValueError(f"Invalid signal: {text!r}")
+    return code
+
+
+def encode_values(values: Tuple[int, ...]) -> int:
+    """Convert a (w, f, t, r, a, d) tuple of 1-based values to its code"""
+    code = _CODE_BY_VALUES.get(tuple(values))
+    if code is None:
+        raise ValueError(f"Invalid signal values: {values!r}")
+    return code
+
+
+# Attribute names a parsed Signal may use for each parameter
+_SIGNAL_ATTRIBUTES: Dict[str, Tuple[str, ...]] = {
+    'w': ('w', 'wind'),
+    'f': ('f', 'fog'),
+    't': ('t', 'temperature'),
+    'r': ('r', 'rain'),
+    'a': ('a', 'avalanche'),
+    'd': ('d', 'difficulty'),
+}
+
+
+def signal_values(signal) -> Tuple[int, ...]:
+    """
+    (w, f, t, r, a, d) values of a parsed signal.
+
+    Each parameter is read from the attribute named by its letter or its
+    full name (w / wind, ..., d / difficulty). Values may be ints, 'd4'
+    style text or enum members of either (uses .value).
+
+    Raises:
+        ValueError: If a parameter is missing or not an integer
+    """
+    values = []
+    for name, _ in SIGNAL_PARAMS:
+        for attribute in _SIGNAL_ATTRIBUTES[name]:
+            if hasattr(signal, attribute):
+                value = getattr(signal, attribute)
+                break
+        else:
+            raise ValueError(f"Signal has no {name} value: {signal!r}")
+
+        value = getattr(value, 'value', value)
+        if isinstance(value, str):
+            value = value.strip().lower().lstrip(name)
+        try:
+            values.append(int(value))
+        except (TypeError, ValueError):
+            raise ValueError(f"Invalid {name} value in signal: {value!r}") from None
+    return tuple(values)
+
+
+def signal_code(signal) -> int:
+    """
+    Code of a parsed signal.
+
+    Raises:
+        ValueError: If the signal is outside the code alphabet
+    """
+    return encode_values(signal_values(signal))
+
+
+def decode_signal(code: int) -> str:
+    """Convert signal code back to canonical text"""
+    return SIGNAL_TEXTS[code]
+
+
+def signal_difficulty(code: int) -> int:
+    """Trail difficulty (1-4) of a signal code"""
+    return code % DIFFICULTIES + 1
+
+
+def level_code(level) -> int:
+    """
+    Convert threat level to its 1-byte code.
+
+    Accepts 'E1'..'E5' or a ThreatLevel enum member (uses .value).
+    """
+    name = getattr(level, 'value', level)
+    try:
+        return LEVEL_CODES[name]
+    except KeyError:
+        raise ValueError(f"Unknown threat level: {level!r}") from None
+
+
+def level_name(code: int) -> str:
+    """Convert level code back to 'E1'..'E5'"""
+    return LEVEL_NAMES[code]
@@ -0,0 +1,219 @@
+"""
+Compact assessments and columnar result batches
+================================================
+
+ThreatMatcher.assess_threat returns a full assessment object (signal,
+ThreatLevel, optional trace and recommendations). For bulk processing that
+is hundreds of bytes per signal. This module provides:
+
+  - CompactAssessment: __slots__ object holding only the signal code and
+    level code; text and recommendations are resolved lazily from shared
+    tables
+  - ResultBatch: columnar arrays (uint16 signal codes + uint8 level codes),
+    3 bytes per signal
+  - BatchClassifier: classifies signal lines into ResultBatch objects,
+    validating lines with parse_signal like the per-signal path (each
+    distinct line text once) and calling the matcher at most once per
+    distinct signal code
+"""
+
+from array import array
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from src.evaluator.codes import (
+    LEVEL_NAMES, SIGNAL_SPACE, UNASSESSED,
+    decode_signal, level_code, signal_code, signal_difficulty
+)
+from src.evaluator.signal import parse_signal
+
+
+# Shared recommendation table indexed by level code
+LEVEL_RECOMMENDATIONS = (
+    "",
+    "Normalne monitorowanie",
+    "Zwiększony monitoring",
+    "Wzmożone monitorowanie",
+    "Tylko doświadczeni turyści",
+    "ZAKAZ WSTĘPU",
+)
+
+# Signals per batch when streaming (3 MB of columns)
+DEFAULT_BATCH_SIZE = 1_000_000
+
+# Only the first errors are kept so memory stays bounded
+MAX_BATCH_ERRORS = 100
+
+# Distinct line texts remembered as validated; further new spellings
+# are parsed every time they occur
+MAX_KNOWN_TEXTS = 4 * SIGNAL_SPACE
+
+
+class CompactAssessment:
+    """Lightweight threat assessment: signal code + level code"""
+
+    __slots__ = ('code', 'level')
+
+    def __init__(self, code: int, level: int):
+        self.code = code
+        self.level = level
+
+    @property
+    def signal_text(self) -> str:
+        return decode_signal(self.code)
+
+    @property
+    def difficulty(self) -> int:
+        return signal_difficulty(self.code)
+
+    @property
+    def level_name(self) -> str:
+        return LEVEL_NAMES[self.level]
+
+    @property
+    def recommendations(self) -> str:
+        return LEVEL_RECOMMENDATIONS[self.level]
+
+    def __eq__(self, other):
+        if not isinstance(other, CompactAssessment):
+            return NotImplemented
+        return self.code == other.code and self.level == other.level
+
+    def __hash__(self):
+        return hash((self.code, self.level))
+
+    def __repr__(self):
+        return f"CompactAssessment({self.signal_text} -> {self.level_name})"
+
+
+class ResultBatch:
+    """Columnar batch of assessed signals"""
+
+    __slots__ = ('codes', 'levels', 'errors', 'error_count')
+
+    def __init__(self):
+        self.codes = array('H')      # signal codes (uint16)
+        self.levels = array('B')     # level codes (uint8)
+        self.errors: List[str] = []
+        self.error_count = 0
+
+    def append(self, code: int, level: int):
+        self.codes.append(code)
+        self.levels.append(level)
+
+    def add_error(self, message: str):
+        self.error_count += 1
+        if len(self.errors) < MAX_BATCH_ERRORS:
+            self.errors.append(message)
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def __getitem__(self, index: int) -> CompactAssessment:
+        return CompactAssessment(self.codes[index], self.levels[index])
+
+    def __iter__(self) -> Iterator[CompactAssessment]:
+        for code, level in zip(self.codes, self.levels):
+            yield CompactAssessment(code, level)
+
+    def level_counts(self) -> List[int]:
+        """Number of signals per level code (index 0 = not assessed)"""
+        counts = self.levels.tobytes()
+        return [counts.count(code) for code in range(len(LEVEL_NAMES))]
+
+    @property
+    def nbytes(self) -> int:
+        """Memory used by the column data"""
+        return (
+            len(self.codes) * self.codes.itemsize
+            + len(self.levels) * self.levels.itemsize
+        )
+
+
+class BatchClassifier:
+    """
+    Classify signal lines into columnar batches.
+
+    Lines are validated with parse_signal, so batch and per-signal runs
+    accept the same lines; codes are memoised per line text. Level codes
+    are memoised per signal code in a table of SIGNAL_SPACE bytes, so the
+    matcher is called at most once per distinct signal.
+    """
+
+    def __init__(self, matcher):
+        self.matcher = matcher
+        self._levels = bytearray(SIGNAL_SPACE)   # 0 = not classified yet
+        self._codes: Dict[str, int] = {}         # validated line text -> code
+
+    def code_of(self, line: str) -> int:
+        """
+        Signal code of a line, parsed on its first occurrence.
+
+        Raises:
+            ValueError: If parse_signal rejects the line or the signal is
+                outside the code alphabet
+        """
+        code = self._codes.get(line)
+        if code is None:
+            code = signal_code(parse_signal(line))
+            if len(self._codes) < MAX_KNOWN_TEXTS:
+                self._codes[line] = code
+        return code
+
+    def level_of(self, code: int) -> int:
+        """Level code for a signal code"""
+        level = self._levels[code]
+        if level == UNASSESSED:
+            signal = parse_signal(decode_signal(code))
+            assessment = self.matcher.assess_threat(signal)
+            level = level_code(assessment.threat_level)
+            self._levels[code] = level
+        return level
+
+    def table(self) -> bytearray:
+        """Level code of every signal code (classifies the whole alphabet)"""
+        for code in range(SIGNAL_SPACE):
+            self.level_of(code)
+        return bytearray(self._levels)
+
+    def classify(
+        self,
+        lines: Iterable[str],
+        batch: Optional[ResultBatch] = None
+    ) -> ResultBatch:
+        """Classify all lines into a single batch"""
+        if batch is None:
+            batch = ResultBatch()
+
+        for line in lines:
+            try:
+                code = self.code_of(line)
+            except ValueError as e:
+                batch.add_error(str(e))
+                continue
+            batch.append(code, self.level_of(code))
+
+        return batch
+
+    def iter_batches(
+        self,
+        lines: Iterable[str],
+        batch_size: int = DEFAULT_BATCH_SIZE
+    ) -> Iterator[ResultBatch]:
+        """Classify a stream of lines, yielding batches of up to batch_size signals"""
+        batch = ResultBatch()
+
+        for line in lines:
+            try:
+                code = self.code_of(line)
+            except ValueError as e:
+                batch.add_error(str(e))
+                continue
+
+            batch.append(code, self.level_of(code))
+
+            if len(batch) >= batch_size:
+                yield batch
+                batch = ResultBatch()
+
+        if len(batch) or batch.error_count:
+            yield batch
@@ -0,0 +1,273 @@
+"""
+Memoising classification cache
+===============================
+
+Wraps ThreatMatcher with a bounded cache of assessments keyed by the
+field values of the parsed signal. Unlike the columnar level table
+(compact.py), the cache does not depend on a fixed signal alphabet, so it
+keeps working when the grammar grows new sensors or finer scales; real
+traffic is heavily skewed towards a small set of weather tuples, so a
+small cache absorbs most lookups.
+
+assess_text() skips parsing on hits through a second bounded map from
+signal text to key. Only texts parse_signal accepted are entered there,
+so invalid text raises ValueError whether the cache is warm or cold, and
+a text and its parsed signal share one assessment entry.
+
+Two eviction policies:
+  - 'lru'    OrderedDict, exact least-recently-used
+  - 'clock'  second-chance CLOCK, a hit only sets a reference bit
+
+The cache is cleared whenever the rules change (reload() or a new
+rules_db on the wrapped matcher).
+"""
+
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Hashable, List, Optional
+
+from src.evaluator.signal import parse_signal
+from src.evaluator.threat_matcher import ThreatMatcher
+
+
+DEFAULT_CAPACITY = 1024
+POLICIES = ('lru', 'clock')
+
+
+def _hashable(value) -> Hashable:
+    if isinstance(value, dict):
+        return tuple(sorted((key, _hashable(item)) for key, item in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_hashable(item) for item in value)
+    if isinstance(value, (set, frozenset)):
+        return frozenset(_hashable(item) for item in value)
+    return value
+
+
+def signal_key(signal) -> Hashable:
+    """Cache key of a parsed signal: its fields and values, sorted by name"""
+    try:
+        fields = vars(signal)
+    except TypeError:
+        # __slots__ class
+        fields = {
+            name: getattr(signal, name)
+            for cls in type(signal).__mro__
+            for name in getattr(cls, '__slots__', ())
+            if hasattr(signal, name)
+        }
+    if not fields:
+        # No attribute fields (e.g. a namedtuple) - key on the value itself
+        return (type(signal).__name__, _hashable(signal))
+    return (type(signal).__name__, _hashable(fields))
+
+
+@dataclass
+class CacheStats:
+    """Cache metrics"""
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    invalidations: int = 0
+    size: int = 0
+    capacity: int = 0
+
+    @property
+    def lookups(self) -> int:
+        return self.hits + self.misses
+
+    @property
+    def hit_rate(self) -> float:
+        return self.hits / self.lookups if self.lookups else 0.0
+
+    def __str__(self):
+        return (
+            f"hit rate {100 * self.hit_rate:.1f}% ({self.hits}/{self.lookups}), "
+            f"evictions {self.evictions}, size {self.size}/{self.capacity}, "
+            f"invalidations {self.invalidations}"
+        )
+
+
+class LRUCache:
+    """Least-recently-used cache"""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._data: OrderedDict = OrderedDict()
+
+    def get(self, key):
+        value = self._data.get(key)
+        if value is not None:
+            self._data.move_to_end(key)
+        return value
+
+    def put(self, key, value) -> bool:
+        """Insert; returns True if an entry was evicted"""
+        self._data[key] = value
+        if len(self._data) > self.capacity:
+            self._data.popitem(last=False)
+            return True
+        return False
+
+    def clear(self):
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class ClockCache:
+    """Second-chance CLOCK cache: hits only set a reference bit"""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._slots: Dict[Hashable, int] = {}
+        self._keys: List[Optional[Hashable]] = [None] * capacity
+        self._values: List = [None] * capacity
+        self._referenced = bytearray(capacity)
+        self._hand = 0
+
+    def get(self, key):
+        slot = self._slots.get(key)
+        if slot is None:
+            return None
+        self._referenced[slot] = 1
+        return self._values[slot]
+
+    def put(self, key, value) -> bool:
+        """Insert; returns True if an entry was evicted"""
+        slot = self._slots.get(key)
+        if slot is not None:
+            self._values[slot] = value
+            self._referenced[slot] = 1
+            return False
+
+        evicted = False
+        if len(self._slots) < self.capacity:
+            slot = len(self._slots)
+        else:
+            # Advance the hand, clearing reference bits, to the first unreferenced slot
+            while self._referenced[self._hand]:
+                self._referenced[self._hand] = 0
+                self._hand = (self._hand + 1) % self.capacity
+            slot = self._hand
+            self._hand = (self._hand + 1) % self.capacity
+            del self._slots[self._keys[slot]]
+            evicted = True
+
+        self._slots[key] = slot
+        self._keys[slot] = key
+        self._values[slot] = value
+        self._referenced[slot] = 0
+        return evicted
+
+    def clear(self):
+        self._slots.clear()
+        self._keys = [None] * self.capacity
+        self._values = [None] * self.capacity
+        self._referenced = bytearray(self.capacity)
+        self._hand = 0
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+
+class MemoizedMatcher:
+    """
+    ThreatMatcher with a bounded memo cache of assessments.
+
+    Drop-in for ThreatMatcher.assess_threat; traced assessments are never
+    cached. assess_text() also skips signal parsing on hits.
+    """
+
+    def __init__(
+        self,
+        matcher: ThreatMatcher,
+        capacity: int = DEFAULT_CAPACITY,
+        policy: str = 'lru'
+    ):
+        if capacity <= 0:
+            raise ValueError("Cache capacity must be positive")
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown cache policy: {policy!r} (use {' or '.join(POLICIES)})")
+
+        self.matcher = matcher
+        self.policy = policy
+        cache_class = LRUCache if policy == 'lru' else ClockCache
+        self._cache = cache_class(capacity)
+        self._keys = cache_class(capacity)      # signal text -> signal_key
+        self._rules_db = matcher.rules_db
+        self._stats = CacheStats(capacity=capacity)
+
+    @property
+    def rules_db(self):
+        return self.matcher.rules_db
+
+    @property
+    def stats(self) -> CacheStats:
+        self._stats.size = len(self._cache)
+        return self._stats
+
+    def invalidate(self):
+        """Drop all cached assessments"""
+        self._cache.clear()
+        self._stats.invalidations += 1
+
+    def reload(self, rules_db, **matcher_kwargs):
+        """Switch to new rules and invalidate the cache"""
+        self.matcher = ThreatMatcher(rules_db, **matcher_kwargs)
+        self._rules_db = rules_db
+        self.invalidate()
+
+    def _check_rules(self):
+        if self.matcher.rules_db is not self._rules_db:
+            self._rules_db = self.matcher.rules_db
+            self.invalidate()
+
+    def _lookup(self, key):
+        self._check_rules()
+        assessment = self._cache.get(key)
+        if assessment is not None:
+            self._stats.hits += 1
+        else:
+            self._stats.misses += 1
+        return assessment
+
+    def _store(self, key, assessment):
+        if self._cache.put(key, assessment):
+            self._stats.evictions += 1
+
+    def assess_threat(self, signal, include_trace: bool = False):
+        """Assess a parsed signal, using the cache unless a trace is requested"""
+        if include_trace:
+            return self.matcher.assess_threat(signal, include_trace=True)
+
+        key = signal_key(signal)
+        assessment = self._lookup(key)
+        if assessment is None:
+            assessment = self.matcher.assess_threat(signal)
+            self._store(key, assessment)
+        return assessment
+
+    def assess_text(self, signal_text: str):
+        """
+        Assess signal text; parsing happens only on cache misses.
+
+        Raises:
+            ValueError: If the signal text is invalid
+        """
+        signal = None
+        key = self._keys.get(signal_text)
+        if key is None:
+            signal = parse_signal(signal_text)
+            key = signal_key(signal)
+            self._keys.put(signal_text, key)
+
+        assessment = self._lookup(key)
+        if assessment is None:
+            if signal is None:
+                # Known text whose assessment was evicted
+                signal = parse_signal(signal_text)
+            assessment = self.matcher.assess_threat(signal)
+            self._store(key, assessment)
+        return assessment
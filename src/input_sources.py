@@ -0,0 +1,345 @@
+"""
+Signal input sources - compressed, chunked and multi-file input
+================================================================
+
+Opens signal archives transparently regardless of compression and streams
+them line by line with bounded memory:
+
+  - plain text, gzip (.gz), xz/lzma (.xz, .lzma) and bzip2 (.bz2)
+    detected by file extension or by magic bytes
+  - "-" reads from stdin (compressed stdin is detected too)
+  - directories and glob patterns expand to a sorted list of files
+  - a source that cannot be read or decompressed is skipped and recorded,
+    the remaining sources are still processed
+
+Data is read in large binary chunks and split into lines in bulk, so only
+one chunk (plus a partial trailing line of at most MAX_LINE_LENGTH bytes)
+is held in memory at a time.
+"""
+
+import bz2
+import glob
+import gzip
+import lzma
+import os
+import sys
+import time
+import zlib
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import BinaryIO, Iterator, List, Optional
+
+
+STDIN = "-"
+
+# 4 MiB chunks: large enough to amortise per-read overhead,
+# small enough to keep memory bounded on multi-GB archives
+DEFAULT_CHUNK_SIZE = 4 * 1024 * 1024
+
+# Signal lines are a few dozen bytes; longer lines (e.g. a binary file picked
+# up by directory expansion) are discarded instead of buffered
+MAX_LINE_LENGTH = 64 * 1024
+
+_EXTENSIONS = {
+    ".gz": "gzip",
+    ".gzip": "gzip",
+    ".xz": "xz",
+    ".lzma": "xz",
+    ".bz2": "bz2",
+}
+
+_MAGIC = (
+    (b"\x1f\x8b", "gzip"),
+    (b"\xfd7zXZ\x00", "xz"),
+    (b"BZh", "bz2"),
+)
+
+_MAGIC_LEN = max(len(magic) for magic, _ in _MAGIC)
+
+# Unreadable files and corrupt or truncated compressed data
+# (gzip.BadGzipFile and bz2 errors are OSError)
+SOURCE_ERRORS = (OSError, EOFError, lzma.LZMAError, zlib.error)
+
+
+def detect_compression(path: str, head: Optional[bytes] = None) -> Optional[str]:
+    """
+    Detect compression of a source.
+
+    Extension wins; otherwise the first bytes are compared against
+    known magic numbers. Returns 'gzip', 'xz', 'bz2' or None for plain text.
+    """
+    if path != STDIN:
+        suffix = Path(path).suffix.lower()
+        if suffix in _EXTENSIONS:
+            return _EXTENSIONS[suffix]
+
+        if head is None:
+            with open(path, 'rb') as f:
+                head = f.read(_MAGIC_LEN)
+
+    for magic, kind in _MAGIC:
+        if head and head.startswith(magic):
+            return kind
+
+    return None
+
+
+def is_compressed(path: str) -> bool:
+    """True if the source is a compressed file on disk"""
+    return path != STDIN and detect_compression(path) is not None
+
+
+def expand_sources(spec: str) -> List[str]:
+    """
+    Expand --signals argument into a list of sources.
+
+    Accepts "-" (stdin), a single file, a directory (all files inside,
+    recursively, sorted) or a glob pattern (sorted matches).
+
+    Raises:
+        FileNotFoundError: If nothing matches the specification
+    """
+    if spec == STDIN:
+        return [STDIN]
+
+    path = Path(spec)
+
+    if path.is_dir():
+        files = sorted(
+            str(p) for p in path.rglob('*')
+            if p.is_file() and not p.name.startswith('.')
+        )
+        if not files:
+            raise FileNotFoundError(f"No signal files in directory: {spec}")
+        return files
+
+    if glob.has_magic(spec):
+        files = sorted(p for p in glob.glob(spec, recursive=True) if os.path.isfile(p))
+        if not files:
+            raise FileNotFoundError(f"No files match pattern: {spec}")
+        return files
+
+    if not path.exists():
+        raise FileNotFoundError(f"Signals file not found: {spec}")
+
+    return [spec]
+
+
+class _PeekedStream:
+    """Binary stream wrapper that replays already-peeked bytes (for stdin)"""
+
+    def __init__(self, head: bytes, stream: BinaryIO):
+        self._head = head
+        self._stream = stream
+
+    def read(self, size: int = -1) -> bytes:
+        if self._head:
+            if size < 0:
+                data = self._head + self._stream.read()
+                self._head = b""
+                return data
+            data = self._head[:size]
+            self._head = self._head[size:]
+            if len(data) < size:
+                data += self._stream.read(size - len(data))
+            return data
+        return self._stream.read(size)
+
+    def close(self):
+        pass
+
+
+def _decompressor(kind: Optional[str], raw):
+    if kind == "gzip":
+        return gzip.GzipFile(fileobj=raw, mode='rb')
+    if kind == "xz":
+        return lzma.LZMAFile(raw, mode='rb')
+    if kind == "bz2":
+        return bz2.BZ2File(raw, mode='rb')
+    return raw
+
+
+class _SourceStream:
+    """Decompressed stream that also closes the underlying raw stream"""
+
+    def __init__(self, stream, raw):
+        self._stream = stream
+        self._raw = raw
+
+    def read(self, size: int = -1) -> bytes:
+        return self._stream.read(size)
+
+    def close(self):
+        if self._stream is not self._raw:
+            self._stream.close()
+        self._raw.close()
+
+
+class _CountingReader:
+    """Counts raw (on-disk) bytes consumed from the underlying stream"""
+
+    def __init__(self, raw, stats: "InputStats"):
+        self._raw = raw
+        self._stats = stats
+
+    def read(self, size: int = -1) -> bytes:
+        data = self._raw.read(size)
+        self._stats.bytes_read += len(data)
+        return data
+
+    def readable(self) -> bool:
+        return True
+
+    def close(self):
+        self._raw.close()
+
+
+@dataclass
+class InputStats:
+    """Throughput counters for a streaming run"""
+    sources: int = 0
+    bytes_read: int = 0          # bytes read from disk/stdin (compressed size)
+    bytes_decoded: int = 0       # bytes after decompression
+    lines: int = 0
+    signals: int = 0
+    errors: int = 0
+    failed_sources: List[str] = field(default_factory=list)     # "source: error"
+    started_at: float = field(default_factory=time.perf_counter)
+    elapsed: float = 0.0
+
+    def finish(self):
+        self.elapsed = time.perf_counter() - self.started_at
+
+    @property
+    def mb_per_second(self) -> float:
+        """Decompressed megabytes processed per second"""
+        if self.elapsed <= 0:
+            return 0.0
+        return self.bytes_decoded / (1024 * 1024) / self.elapsed
+
+    @property
+    def signals_per_second(self) -> float:
+        if self.elapsed <= 0:
+            return 0.0
+        return self.signals / self.elapsed
+
+
+def open_source(path: str, stats: Optional[InputStats] = None):
+    """
+    Open a source as a decompressed binary stream.
+
+    Args:
+        path: File path or "-" for stdin
+        stats: Optional stats object updated with raw bytes read
+
+    Returns:
+        Binary file-like object with read(size)
+    """
+    if path == STDIN:
+        stdin = sys.stdin.buffer
+        head = stdin.read(_MAGIC_LEN)
+        raw = _PeekedStream(head, stdin)
+        kind = detect_compression(STDIN, head)
+    else:
+        raw = open(path, 'rb')
+        kind = detect_compression(path)
+
+    if stats is not None:
+        raw = _CountingReader(raw, stats)
+
+    return _SourceStream(_decompressor(kind, raw), raw)
+
+
+def oversized_line(size: int) -> str:
+    """Placeholder yielded for a line longer than the line length limit"""
+    return f"<line too long: {size} bytes>"
+
+
+def iter_lines(
+    stream,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    stats: Optional[InputStats] = None,
+    max_line_length: int = MAX_LINE_LENGTH
+) -> Iterator[str]:
+    """
+    Yield stripped, non-empty, non-comment lines from a binary stream.
+
+    Reads fixed-size chunks and splits each one with a single bytes.split,
+    carrying the incomplete last line over to the next chunk.
+
+    Lines longer than max_line_length are not buffered: their bytes are
+    discarded and an oversized_line() placeholder is yielded instead, so
+    the line is reported like any other invalid signal.
+    """
+    tail = b""
+    skipped = 0     # bytes discarded so far of an oversized line
+
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+
+        if stats is not None:
+            stats.bytes_decoded += len(chunk)
+
+        lines = (tail + chunk).split(b"\n")
+        tail = lines.pop()
+
+        for raw_line in lines:
+            if skipped or len(raw_line) > max_line_length:
+                if stats is not None:
+                    stats.lines += 1
+                yield oversized_line(skipped + len(raw_line))
+                skipped = 0
+                continue
+
+            line = raw_line.strip()
+            if not line or line.startswith(b"#"):
+                continue
+            if stats is not None:
+                stats.lines += 1
+            yield line.decode('utf-8', errors='replace')
+
+        if len(tail) > max_line_length:
+            skipped += len(tail)
+            tail = b""
+
+    if skipped:
+        if stats is not None:
+            stats.lines += 1
+        yield oversized_line(skipped + len(tail))
+        return
+
+    line = tail.strip()
+    if line and not line.startswith(b"#"):
+        if stats is not None:
+            stats.lines += 1
+        yield line.decode('utf-8', errors='replace')
+
+
+def iter_signal_lines(
+    sources: List[str],
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    stats: Optional[InputStats] = None,
+    max_line_length: int = MAX_LINE_LENGTH
+) -> Iterator[str]:
+    """
+    Yield signal lines from all sources in order.
+
+    With stats, a source that fails to open or decode (SOURCE_ERRORS) is
+    recorded in stats.failed_sources and skipped; lines it yielded before
+    the failure stay processed. Without stats the error propagates.
+    """
+    for source in sources:
+        if stats is not None:
+            stats.sources += 1
+        try:
+            stream = open_source(source, stats)
+            try:
+                yield from iter_lines(stream, chunk_size, stats, max_line_length)
+            finally:
+                stream.close()
+        except SOURCE_ERRORS as e:
+            if stats is None:
+                raise
+            stats.failed_sources.append(f"{source}: {e}")
@@ -0,0 +1,387 @@
+"""
+Per-phase profiling (--profile)
+================================
+
+Measures wall-clock and CPU time per processing phase:
+
+    imports, rules parse (lexer / parser / model building), matcher
+    compilation, input reading, signal parsing, classification, output
+    (a single plain file run through StreamProcessor is one phase,
+    file processing)
+
+Phase times are always measured with no profiler running, and bulk
+phases are timed per chunk of signals (timed_chunks, phase(calls=n)) so
+the clocks are read a few times per chunk rather than per signal.
+Profiler data comes from separate passes whose own timings are discarded:
+
+  - rules are parsed a second time under cProfile; the shares of the ANTLR
+    lexer, the ANTLR parser and model building (by the source file of each
+    profiled function) split the uninstrumented parse time, so the split
+    needs no changes to the parser code
+  - with an output prefix, record() runs the workload twice more with the
+    phase timers off - once under cProfile, once under SIGPROF stack
+    sampling, so neither skews the other - and writes:
+
+  - <prefix>.pstats     cProfile dump (python -m pstats, snakeviz, ...)
+  - <prefix>.collapsed  collapsed stacks for flamegraph.pl / speedscope,
+                        sampled with SIGPROF where available, otherwise
+                        one stack per phase weighted by wall time (us)
+"""
+
+import contextlib
+import cProfile
+import os
+import pstats
+import signal
+import time
+from collections import Counter
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+# Report order of known phases; unknown phases are listed after them
+PHASES = (
+    'imports',
+    'rules parse',
+    'rules parse/lexer',
+    'rules parse/parser',
+    'rules parse/model building',
+    'matcher compilation',
+    'file processing',
+    'input reading',
+    'signal parsing',
+    'classification',
+    'output',
+)
+
+SAMPLE_INTERVAL = 0.001     # seconds between SIGPROF samples
+
+# Items per timed_chunks() chunk
+DEFAULT_CHUNK = 4096
+
+_CAN_SAMPLE = hasattr(signal, 'setitimer') and hasattr(signal, 'SIGPROF')
+
+
+class _PhaseTimer:
+    """Context manager accumulating wall/CPU time of one phase"""
+
+    __slots__ = ('profiler', 'name', 'calls', 'wall', 'cpu')
+
+    def __init__(self, profiler: "PhaseProfiler", name: str, calls: int):
+        self.profiler = profiler
+        self.name = name
+        self.calls = calls
+
+    def __enter__(self):
+        self.profiler._stack.append(self.name)
+        self.wall = time.perf_counter()
+        self.cpu = time.process_time()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.add(
+            self.name,
+            time.perf_counter() - self.wall,
+            time.process_time() - self.cpu,
+            self.calls
+        )
+        self.profiler._stack.pop()
+        return False
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class PhaseProfiler:
+    """
+    Accumulates wall-clock and CPU time per named phase.
+
+    A disabled profiler hands out a shared no-op timer, so instrumented
+    code costs next to nothing when --profile is off.
+    """
+
+    def __init__(self, enabled: bool = True, output_prefix: Optional[str] = None):
+        """
+        Args:
+            enabled: Collect timings
+            output_prefix: Write <prefix>.pstats and <prefix>.collapsed
+        """
+        self.enabled = enabled or output_prefix is not None
+        self.output_prefix = output_prefix
+        self.wall: Dict[str, float] = {}
+        self.cpu: Dict[str, float] = {}
+        self.calls: Dict[str, int] = {}
+        self._stack: List[str] = []
+        self._stats: Optional[pstats.Stats] = None
+        self._samples: Counter = Counter()
+
+    # ------------------------------------------------------------------
+    # Timing
+    # ------------------------------------------------------------------
+
+    def phase(self, name: str, calls: int = 1):
+        """
+        Context manager timing a phase (accumulates over repeated use);
+        calls is the number of items handled, e.g. the signals of a chunk
+        """
+        if not self.enabled:
+            return _NULL_TIMER
+        return _PhaseTimer(self, name, calls)
+
+    def add(self, name: str, wall: float, cpu: float, calls: int = 1):
+        """Add externally measured time to a phase"""
+        self.wall[name] = self.wall.get(name, 0.0) + wall
+        self.cpu[name] = self.cpu.get(name, 0.0) + cpu
+        self.calls[name] = self.calls.get(name, 0) + calls
+
+    def timed_iter(self, iterable: Iterable, name: str) -> Iterator:
+        """Yield from iterable, charging the time spent producing items to a phase"""
+        if not self.enabled:
+            yield from iterable
+            return
+
+        iterator = iter(iterable)
+        while True:
+            with self.phase(name):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+
+    def timed_chunks(self, iterable: Iterable, name: str, size: int = DEFAULT_CHUNK) -> Iterator[List]:
+        """
+        Yield lists of up to size items, charging the time spent producing
+        each list to a phase (one timing per chunk, calls = items).
+
+        Reads ahead, so not for interactive input - use timed_iter there.
+        """
+        iterator = iter(iterable)
+        while True:
+            with self.phase(name, 0) as timer:
+                chunk = list(islice(iterator, size))
+                if self.enabled:
+                    timer.calls = len(chunk)
+            if not chunk:
+                return
+            yield chunk
+
+    # ------------------------------------------------------------------
+    # Rules parse breakdown
+    # ------------------------------------------------------------------
+
+    def profile_rules_parse(self, parse, *args):
+        """
+        Run parse(*args) as the 'rules parse' phase and split the time of
+        this call into lexer, parser and model building.
+
+        The split comes from a second parse under cProfile, so profiling
+        overhead never enters the reported times.
+        """
+        if not self.enabled:
+            return parse(*args)
+
+        wall, cpu = time.perf_counter(), time.process_time()
+        result = parse(*args)
+        wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+        self.add('rules parse', wall, cpu)
+
+        self._stack.append('rules parse')
+        try:
+            stats = self._profiled(parse, *args)
+            if self.output_prefix is not None and _CAN_SAMPLE:
+                self._sampled(parse, *args)
+        finally:
+            self._stack.pop()
+
+        for part, share in split_rules_parse(stats).items():
+            self.add(f'rules parse/{part}', wall * share, cpu * share)
+
+        return result
+
+    # ------------------------------------------------------------------
+    # Instrumented passes for dumps
+    # ------------------------------------------------------------------
+
+    def record(self, run, *args):
+        """
+        Run run(*args) for the dumps (only with an output prefix): once
+        under cProfile, then once under SIGPROF stack sampling.
+
+        Phase timers are off during both passes and their standard output
+        is discarded - the report keeps the uninstrumented measurements.
+        """
+        if self.output_prefix is None:
+            return
+
+        enabled, self.enabled = self.enabled, False
+        try:
+            with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+                self._profiled(run, *args)
+                if _CAN_SAMPLE:
+                    self._sampled(run, *args)
+        finally:
+            self.enabled = enabled
+
+    def _profiled(self, run, *args) -> pstats.Stats:
+        """Run under cProfile; the stats are kept for the dump and returned"""
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            run(*args)
+        finally:
+            profile.disable()
+
+        self._merge_stats(pstats.Stats(profile))
+        return pstats.Stats(profile)
+
+    def _sampled(self, run, *args):
+        """Run under SIGPROF sampling, collecting stacks for the .collapsed dump"""
+        signal.signal(signal.SIGPROF, self._sample)
+        signal.setitimer(signal.ITIMER_PROF, SAMPLE_INTERVAL, SAMPLE_INTERVAL)
+        try:
+            run(*args)
+        finally:
+            signal.setitimer(signal.ITIMER_PROF, 0, 0)
+            signal.signal(signal.SIGPROF, signal.SIG_DFL)
+
+    def _merge_stats(self, stats: pstats.Stats):
+        if self._stats is None:
+            self._stats = stats
+        else:
+            self._stats.add(stats)
+
+    def _sample(self, signum, frame):
+        # Frames from the sampled run down, without the profiler's own
+        stack = []
+        while frame is not None and frame.f_code is not _SAMPLED_CODE:
+            code = frame.f_code
+            stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+            frame = frame.f_back
+        stack.reverse()
+        self._samples[';'.join(self._stack + stack)] += 1
+
+    def write_dumps(self) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Write <prefix>.pstats and <prefix>.collapsed; returns their paths
+        (None, None if there is no prefix or no instrumented pass ran).
+        """
+        if self.output_prefix is None or self._stats is None:
+            return None, None
+
+        pstats_path = f"{self.output_prefix}.pstats"
+        collapsed_path = f"{self.output_prefix}.collapsed"
+
+        self._stats.dump_stats(pstats_path)
+
+        with open(collapsed_path, 'w', encoding='utf-8') as f:
+            if self._samples:
+                for stack, count in sorted(self._samples.items()):
+                    f.write(f"{stack} {count}\n")
+            else:
+                # No sampling available: one stack per leaf phase, weight in us
+                for name in self.ordered_phases():
+                    weight = int(self.wall[name] * 1_000_000)
+                    if weight and not self._has_children(name):
+                        f.write(f"{name.replace('/', ';')} {weight}\n")
+
+        return pstats_path, collapsed_path
+
+    # ------------------------------------------------------------------
+    # Report
+    # ------------------------------------------------------------------
+
+    def _has_children(self, name: str) -> bool:
+        prefix = name + '/'
+        return any(other.startswith(prefix) for other in self.wall)
+
+    def ordered_phases(self) -> List[str]:
+        known = [name for name in PHASES if name in self.wall]
+        return known + sorted(name for name in self.wall if name not in PHASES)
+
+    def report_rows(self) -> List[Tuple[str, float, float, int, float]]:
+        """(phase, wall s, cpu s, calls, % of total wall) rows for display"""
+        total = sum(
+            wall for name, wall in self.wall.items() if '/' not in name
+        )
+        rows = []
+        for name in self.ordered_phases():
+            wall = self.wall[name]
+            share = 100 * wall / total if total else 0.0
+            label = '  ' + name.split('/', 1)[1] if '/' in name else name
+            rows.append((label, wall, self.cpu[name], self.calls[name], share))
+        rows.append(('total', total, sum(
+            cpu for name, cpu in self.cpu.items() if '/' not in name
+        ), 0, 100.0 if total else 0.0))
+        return rows
+
+    def format_report(self) -> str:
+        """Plain-text phase table"""
+        lines = [f"{'Phase':<22} {'Wall (s)':>10} {'CPU (s)':>10} {'Calls':>9} {'Share':>7}"]
+        lines.append('-' * len(lines[0]))
+        for label, wall, cpu, calls, share in self.report_rows():
+            calls_text = str(calls) if calls else ''
+            lines.append(
+                f"{label:<22} {wall:>10.4f} {cpu:>10.4f} {calls_text:>9} {share:>6.1f}%"
+            )
+        return '\n'.join(lines)
+
+
+_SAMPLED_CODE = PhaseProfiler._sampled.__code__
+
+
+def _rules_parse_part(filename: str) -> str:
+    name = os.path.basename(filename)
+    if 'Lexer' in name:
+        return 'lexer'
+    if 'Parser' in name or 'antlr4' in filename.replace('\\', '/').split('/'):
+        return 'parser'
+    return 'model building'
+
+
+def _is_builtin(filename: str) -> bool:
+    return filename.startswith('~') or filename.startswith('<')
+
+
+def split_rules_parse(stats: pstats.Stats) -> Dict[str, float]:
+    """
+    Share of rules-parse time spent in lexer, parser and model building.
+
+    Attribution uses each function's own time (tottime): ANTLR lexer files
+    count as lexer, generated parser files and the rest of the ANTLR
+    runtime as parser, everything else (visitor, models) as model building.
+    Time of built-in functions goes to the parts of their callers.
+    """
+    totals = {'lexer': 0.0, 'parser': 0.0, 'model building': 0.0}
+
+    for (filename, _, _), (_, _, tottime, _, callers) in stats.stats.items():
+        if not _is_builtin(filename):
+            totals[_rules_parse_part(filename)] += tottime
+            continue
+
+        caller_times = {
+            caller: caller_stats[2]
+            for caller, caller_stats in callers.items()
+            if not _is_builtin(caller[0])
+        }
+        caller_total = sum(caller_times.values())
+        if not caller_total:
+            totals['model building'] += tottime
+            continue
+        for caller, caller_time in caller_times.items():
+            totals[_rules_parse_part(caller[0])] += tottime * caller_time / caller_total
+
+    grand = sum(totals.values())
+    if not grand:
+        return {'model building': 1.0}
+    return {part: value / grand for part, value in totals.items()}
@@ -0,0 +1,339 @@
+"""
+Sliding time-window aggregation over the signal stream
+=======================================================
+
+Counts assessed signals per (threat level, trail difficulty) over sliding
+windows such as "last 5 / 15 / 60 minutes" without keeping raw signals.
+
+Time is split into fixed buckets (default 60 s; bucket_seconds_for picks a
+shorter one for windows given in seconds) kept in a ring buffer of
+per-bucket counters. For every window a running total of the current span
+and of the span just before it is maintained, so:
+
+  - adding a signal is O(number of windows)
+  - moving time forward by one bucket is O(number of windows)
+  - querying a window is O(1)
+
+Escalation rules compare window totals against a count threshold or against
+the previous span (rate of change) and call a callback when they fire.
+
+Timestamped input lines carry a leading field with epoch seconds or an
+ISO-8601 time:  2025-01-05T06:15:00,w3,f3,t1,r1,a1,d4
+"""
+
+import math
+import re
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+
+LEVELS = 5
+DIFFICULTIES = 4
+COUNTERS = LEVELS * DIFFICULTIES
+
+DEFAULT_WINDOWS = (5 * 60, 15 * 60, 60 * 60)
+DEFAULT_BUCKET_SECONDS = 60
+
+# E4 and above are escalation-relevant by default
+DEFAULT_MIN_LEVEL = 4
+
+
+def _counter_index(level: int, difficulty: int) -> int:
+    return (level - 1) * DIFFICULTIES + (difficulty - 1)
+
+
+def parse_timestamp(text: str) -> float:
+    """Parse epoch seconds or ISO-8601 time to epoch seconds"""
+    try:
+        return float(text)
+    except ValueError:
+        pass
+    try:
+        return datetime.fromisoformat(text).timestamp()
+    except ValueError:
+        raise ValueError(f"Invalid timestamp: {text!r}") from None
+
+
+def split_timestamp(line: str) -> Tuple[Optional[float], str]:
+    """
+    Split an optional leading timestamp from a signal line.
+
+    Signal fields always start with a letter, so a first field starting
+    with a digit is treated as a timestamp.
+
+    Returns:
+        (timestamp or None, signal text)
+    """
+    if line and line[0].isdigit():
+        stamp, _, rest = line.partition(',')
+        return parse_timestamp(stamp.strip()), rest
+    return None, line
+
+
+def parse_duration(text: str) -> int:
+    """Parse '90s', '15m', '1h' or plain minutes to seconds"""
+    match = re.fullmatch(r'\s*(\d+)\s*([smh]?)\s*', text)
+    if not match:
+        raise ValueError(f"Invalid duration: {text!r}")
+    value, unit = int(match.group(1)), match.group(2) or 'm'
+    return value * {'s': 1, 'm': 60, 'h': 3600}[unit]
+
+
+def format_duration(seconds: int) -> str:
+    """Format window length as '15 min' or '30 s'"""
+    if seconds % 60:
+        return f"{seconds} s"
+    return f"{seconds // 60} min"
+
+
+def bucket_seconds_for(windows: Sequence[int]) -> int:
+    """Largest bucket of at most DEFAULT_BUCKET_SECONDS that divides every window"""
+    return math.gcd(DEFAULT_BUCKET_SECONDS, *windows)
+
+
+@dataclass
+class EscalationRule:
+    """
+    Escalation trigger on a window.
+
+    Fires when the number of signals with level >= min_level (optionally on
+    a single difficulty) in the window reaches `count`, or - for rate rules -
+    when it is at least `rate` times the count of the previous window span.
+    Rules are edge-triggered: they fire once and re-arm when the condition
+    stops holding.
+    """
+    window: int
+    count: int = 1
+    rate: Optional[float] = None
+    difficulty: Optional[int] = None
+    min_level: int = DEFAULT_MIN_LEVEL
+
+    def describe(self) -> str:
+        where = f" on d{self.difficulty}" if self.difficulty else ""
+        what = f"E{self.min_level}+{where} in last {format_duration(self.window)}"
+        if self.rate is not None:
+            return f"{what} >= {self.rate:g}x previous (min {self.count})"
+        return f"{what} >= {self.count}"
+
+
+def parse_escalation_rule(spec: str, min_level: int = DEFAULT_MIN_LEVEL) -> EscalationRule:
+    """
+    Parse escalation rule specification.
+
+    Format:  WINDOW[@dN]:count>=N   or   WINDOW[@dN]:rate>=R[,min=N]
+
+    Examples:
+        15m:count>=10       E4+ events in last 15 minutes >= 10
+        5m@d4:count>=3      same, only on d4 trails
+        5m:rate>=3          last 5 minutes >= 3x the 5 minutes before
+    """
+    match = re.fullmatch(
+        r'\s*(\w+)(?:@d([1-4]))?\s*:\s*(count|rate)\s*>=\s*([\d.]+)'
+        r'(?:\s*,\s*min\s*=\s*(\d+))?\s*',
+        spec
+    )
+    if not match:
+        raise ValueError(f"Invalid escalation rule: {spec!r}")
+
+    window = parse_duration(match.group(1))
+    difficulty = int(match.group(2)) if match.group(2) else None
+    kind, value = match.group(3), match.group(4)
+
+    if kind == 'count':
+        return EscalationRule(window, count=int(float(value)),
+                              difficulty=difficulty, min_level=min_level)
+
+    return EscalationRule(window, count=int(match.group(5) or 1), rate=float(value),
+                          difficulty=difficulty, min_level=min_level)
+
+
+class WindowedAggregator:
+    """Ring buffer of per-bucket (level, difficulty) counters with sliding windows"""
+
+    def __init__(
+        self,
+        windows: Sequence[int] = DEFAULT_WINDOWS,
+        bucket_seconds: int = DEFAULT_BUCKET_SECONDS,
+        rules: Sequence[EscalationRule] = (),
+        on_escalation: Optional[Callable[[EscalationRule, int, int, float], None]] = None
+    ):
+        """
+        Args:
+            windows: Window lengths in seconds (multiples of bucket_seconds)
+            bucket_seconds: Time resolution of the ring buffer
+            rules: Escalation rules (their windows are added automatically)
+            on_escalation: Callback(rule, count, previous_count, timestamp)
+        """
+        self.bucket_seconds = bucket_seconds
+        self.rules = list(rules)
+        self.on_escalation = on_escalation
+
+        all_windows = set(windows) | {rule.window for rule in self.rules}
+        for window in all_windows:
+            if window <= 0 or window % bucket_seconds:
+                raise ValueError(
+                    f"Window {window}s is not a multiple of the {bucket_seconds}s bucket"
+                )
+        self.windows = sorted(all_windows)
+
+        self._spans = {w: w // bucket_seconds for w in self.windows}
+        # Current and previous span of the longest window must fit the ring
+        self._size = 2 * max(self._spans.values())
+        self._ring = [[0] * COUNTERS for _ in range(self._size)]
+        self._current = {w: [0] * COUNTERS for w in self.windows}
+        self._previous = {w: [0] * COUNTERS for w in self.windows}
+        self._head: Optional[int] = None
+        self._active = set()
+        self._rules_min_level = min((rule.min_level for rule in self.rules), default=None)
+
+        self.total = 0
+        self.late_dropped = 0
+
+    # ------------------------------------------------------------------
+    # Updates
+    # ------------------------------------------------------------------
+
+    def add(self, level: int, difficulty: int, timestamp: Optional[float] = None):
+        """
+        Count one assessed signal.
+
+        Args:
+            level: Level code 1-5 (E1-E5)
+            difficulty: Trail difficulty 1-4
+            timestamp: Epoch seconds (default: now)
+        """
+        if timestamp is None:
+            timestamp = time.time()
+
+        bucket = int(timestamp // self.bucket_seconds)
+
+        if self._head is None:
+            self._head = bucket
+        elif bucket > self._head:
+            self._advance(bucket)
+
+        age = self._head - bucket
+        if age >= self._size:
+            self.late_dropped += 1
+            return
+
+        index = _counter_index(level, difficulty)
+        self._ring[bucket % self._size][index] += 1
+
+        for window, span in self._spans.items():
+            if age < span:
+                self._current[window][index] += 1
+            elif age < 2 * span:
+                self._previous[window][index] += 1
+
+        self.total += 1
+
+        if self.rules and level >= self._rules_min_level:
+            self._check_rules(timestamp)
+
+    def advance_to(self, timestamp: float):
+        """Move time forward without a signal (e.g. on an idle stream)"""
+        bucket = int(timestamp // self.bucket_seconds)
+        if self._head is None:
+            self._head = bucket
+        elif bucket > self._head:
+            self._advance(bucket)
+            if self.rules:
+                self._check_rules(timestamp)
+
+    def _advance(self, bucket: int):
+        steps = bucket - self._head
+
+        if steps >= self._size:
+            # Everything expired - reset
+            for counters in self._ring:
+                counters[:] = [0] * COUNTERS
+            for window in self.windows:
+                self._current[window][:] = [0] * COUNTERS
+                self._previous[window][:] = [0] * COUNTERS
+            self._head = bucket
+            return
+
+        for _ in range(steps):
+            self._head += 1
+            head = self._head
+
+            for window, span in self._spans.items():
+                current = self._current[window]
+                previous = self._previous[window]
+
+                # Bucket leaving the current span moves to the previous span
+                moved = self._ring[(head - span) % self._size]
+                # Bucket leaving the previous span expires
+                expired = self._ring[(head - 2 * span) % self._size]
+
+                for i in range(COUNTERS):
+                    current[i] -= moved[i]
+                    previous[i] += moved[i] - expired[i]
+
+            # The new head slot has left every span - reuse it
+            self._ring[head % self._size][:] = [0] * COUNTERS
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _sum(counters: List[int], min_level: int, difficulty: Optional[int]) -> int:
+        if difficulty is not None:
+            return sum(
+                counters[_counter_index(level, difficulty)]
+                for level in range(min_level, LEVELS + 1)
+            )
+        return sum(counters[_counter_index(min_level, 1):])
+
+    def count(
+        self,
+        window: int,
+        min_level: int = DEFAULT_MIN_LEVEL,
+        difficulty: Optional[int] = None
+    ) -> int:
+        """Signals with level >= min_level in the last `window` seconds"""
+        return self._sum(self._current[window], min_level, difficulty)
+
+    def previous_count(
+        self,
+        window: int,
+        min_level: int = DEFAULT_MIN_LEVEL,
+        difficulty: Optional[int] = None
+    ) -> int:
+        """Same as count() for the span of equal length just before the window"""
+        return self._sum(self._previous[window], min_level, difficulty)
+
+    def snapshot(self, min_level: int = DEFAULT_MIN_LEVEL) -> Dict[int, List[int]]:
+        """Per-window counts for difficulties d1..d4"""
+        return {
+            window: [
+                self.count(window, min_level, difficulty)
+                for difficulty in range(1, DIFFICULTIES + 1)
+            ]
+            for window in self.windows
+        }
+
+    # ------------------------------------------------------------------
+    # Escalation
+    # ------------------------------------------------------------------
+
+    def _check_rules(self, timestamp: float):
+        for i, rule in enumerate(self.rules):
+            current = self.count(rule.window, rule.min_level, rule.difficulty)
+            previous = self.previous_count(rule.window, rule.min_level, rule.difficulty)
+
+            if rule.rate is None:
+                firing = current >= rule.count
+            else:
+                firing = current >= rule.count and current >= rule.rate * max(previous, 1)
+
+            if firing and i not in self._active:
+                self._active.add(i)
+                if self.on_escalation:
+                    self.on_escalation(rule, current, previous, timestamp)
+            elif not firing:
+                self._active.discard(i)
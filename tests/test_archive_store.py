@@ -0,0 +1,239 @@
+"""
+Tests for src/archive/store.py - block format, queries with block skipping
+and the bytes.count fast path, checked against a brute-force scan.
+"""
+
+import os
+import random
+import tempfile
+import time
+import unittest
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+
+from src.archive import (
+    ArchiveQuery, ArchiveReader, ArchiveRow, ArchiveWriter, load_code_counts,
+    parse_query
+)
+from src.archive.store import DATA_FILE, HEADER_SIZE
+from src.evaluator.codes import LEVEL_NAMES, SIGNAL_SPACE, encode_signal
+
+
+START = 1_736_000_000
+SOURCES = ["a.txt", "b.txt.gz", "c.txt"]
+
+
+def write_rows(path, version, rows, block_rows=50):
+    """Write (timestamp, source, code, level) rows in one writer session"""
+    with ArchiveWriter(path, version, f"rules {version}", block_rows=block_rows) as writer:
+        for timestamp, source, code, level in rows:
+            writer.append(timestamp, writer.source_id(source), code, level)
+    return [ArchiveRow(ts, source, code, level, version) for ts, source, code, level in rows]
+
+
+def random_rows(rng, count, start=START, step=120):
+    rows = []
+    timestamp = start
+    for _ in range(count):
+        timestamp += rng.randint(0, step)
+        rows.append((timestamp, rng.choice(SOURCES), rng.randrange(SIGNAL_SPACE), rng.randint(1, 5)))
+    return rows
+
+
+def random_query(rng, end):
+    query = ArchiveQuery(limit=rng.choice((0, 5, 20)))
+    if rng.random() < 0.5:
+        query.start = rng.randint(START, end)
+    if rng.random() < 0.5:
+        query.end = rng.randint(query.start or START, end + 1)
+    if rng.random() < 0.3:
+        query.levels = set(rng.sample(range(1, 6), rng.randint(1, 3)))
+    if rng.random() < 0.3:
+        query.difficulties = {rng.randint(1, 4)}
+    if rng.random() < 0.2:
+        query.sources = {rng.choice(SOURCES)}
+    query.group_by = rng.choice((None, None, 'day', 'hour'))
+    return query
+
+
+def brute_force(rows, query):
+    matching = [
+        row for row in rows
+        if (query.start is None or row.timestamp >= query.start)
+        and (query.end is None or row.timestamp < query.end)
+        and (query.levels is None or row.level in query.levels)
+        and (query.difficulties is None or row.difficulty in query.difficulties)
+        and (query.codes is None or row.code in query.codes)
+        and (query.sources is None or row.source in query.sources)
+    ]
+    level_counts = [0] * len(LEVEL_NAMES)
+    groups = {}
+    fmt = '%Y-%m-%d %H:00' if query.group_by == 'hour' else '%Y-%m-%d'
+    for row in matching:
+        level_counts[row.level] += 1
+        if query.group_by:
+            label = datetime.fromtimestamp(row.timestamp).strftime(fmt)
+            groups.setdefault(label, [0] * len(LEVEL_NAMES))[row.level] += 1
+    return len(matching), level_counts, dict(sorted(groups.items())), matching[:query.limit]
+
+
+class ArchiveTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self._tmp.name) / "store"
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def assert_query(self, reader, query):
+        """Query result equals a brute-force scan of self.rows"""
+        result = reader.query(query)
+        total, level_counts, groups, rows = brute_force(self.rows, query)
+        self.assertEqual(result.total, total, query)
+        self.assertEqual(result.level_counts, level_counts, query)
+        self.assertEqual(result.groups, groups, query)
+        self.assertEqual(result.rows, rows, query)
+
+
+class RoundTripTests(ArchiveTestCase):
+
+    def setUp(self):
+        super().setUp()
+        rng = random.Random(29)
+        first = random_rows(rng, 700)
+        second = random_rows(rng, 500, start=first[-1][0])
+        self.rows = write_rows(self.path, "v1", first) + write_rows(self.path, "v2", second, 64)
+
+    def test_rows_and_metadata(self):
+        with ArchiveReader(self.path) as reader:
+            self.assertEqual(reader.versions, ["v1", "v2"])
+            self.assertEqual(sorted(reader.sources), sorted(SOURCES))
+            self.assertEqual(reader.total_rows, len(self.rows))
+            self.assertEqual(len(reader.blocks), 14 + 8)
+            self.assertEqual(list(reader.iter_rows(ArchiveQuery())), self.rows)
+            self.assertEqual({block.version for block in reader.blocks[:14]}, {0})
+            self.assertEqual({block.version for block in reader.blocks[14:]}, {1})
+
+    def test_code_counts(self):
+        for version in ("v1", "v2"):
+            expected = Counter(row.code for row in self.rows if row.rules_version == version)
+            counts = load_code_counts(self.path, version)
+            self.assertEqual(len(counts), SIGNAL_SPACE)
+            self.assertEqual({code: n for code, n in enumerate(counts) if n}, dict(expected))
+
+    def test_queries_match_brute_force(self):
+        rng = random.Random(290)
+        end = self.rows[-1].timestamp
+        with ArchiveReader(self.path) as reader:
+            self.assertTrue(all(block.sorted for block in reader.blocks))
+            for _ in range(300):
+                query = random_query(rng, end)
+                if rng.random() < 0.1:
+                    query.codes = {rng.choice(self.rows).code, rng.randrange(SIGNAL_SPACE)}
+                self.assert_query(reader, query)
+
+    def test_unfiltered_groups_match_brute_force(self):
+        # Blocks span many hours and days - counted per group segment
+        with ArchiveReader(self.path) as reader:
+            for group_by in ('day', 'hour'):
+                for start, end in ((None, None), (START + 5000, START + 40000)):
+                    self.assert_query(reader, ArchiveQuery(start=start, end=end, group_by=group_by))
+
+    def test_time_filter_skips_blocks(self):
+        with ArchiveReader(self.path) as reader:
+            block = reader.blocks[3]
+            result = reader.query(ArchiveQuery(start=block.min_ts, end=block.max_ts + 1))
+            self.assertLess(result.blocks_scanned, 4)
+            self.assertEqual(result.blocks_total, len(reader.blocks))
+
+    def test_parse_query(self):
+        query = parse_query("E4+ d4 from=1736000000 to=2025-01-05T09:00 source=a.txt by=hour limit=3")
+        self.assertEqual(query.levels, {4, 5})
+        self.assertEqual(query.difficulties, {4})
+        self.assertEqual(query.start, 1736000000)
+        self.assertEqual(query.end, int(datetime(2025, 1, 5, 9).timestamp()))
+        self.assertEqual(query.sources, {"a.txt"})
+        self.assertEqual((query.group_by, query.limit), ('hour', 3))
+        self.assertEqual(parse_query("w3,f3,t1,r1,a1,d4").codes, {encode_signal("w3,f3,t1,r1,a1,d4")})
+        for text in ("E6", "by=week", "colour=red", "level=E9", "zz"):
+            with self.assertRaises(ValueError):
+                parse_query(text)
+
+
+class LateRowTests(ArchiveTestCase):
+    """Out-of-order timestamps: blocks are not sorted, rows are checked one by one"""
+
+    def setUp(self):
+        super().setUp()
+        rng = random.Random(1029)
+        rows = random_rows(rng, 900, step=300)
+        for i in rng.sample(range(len(rows)), 60):
+            timestamp, source, code, level = rows[i]
+            rows[i] = (timestamp - rng.randint(1, 20000), source, code, level)
+        self.rows = write_rows(self.path, "v1", rows, block_rows=100)
+
+    def test_queries_match_brute_force(self):
+        rng = random.Random(2900)
+        with ArchiveReader(self.path) as reader:
+            self.assertEqual(list(reader.iter_rows(ArchiveQuery())), self.rows)
+            self.assertFalse(all(block.sorted for block in reader.blocks))
+            for _ in range(200):
+                self.assert_query(reader, random_query(rng, self.rows[-1].timestamp))
+
+
+class TornBlockTests(ArchiveTestCase):
+
+    def test_writer_truncates_torn_block(self):
+        rng = random.Random(2029)
+        rows = write_rows(self.path, "v1", random_rows(rng, 120))
+        data_path = self.path / DATA_FILE
+        complete = data_path.stat().st_size
+
+        # Interrupted writer: a header and part of the columns of a block
+        with open(data_path, 'rb') as f:
+            head = f.read(HEADER_SIZE + 100)
+        with open(data_path, 'ab') as f:
+            f.write(head)
+
+        with ArchiveReader(self.path) as reader:
+            self.assertEqual(reader.total_rows, len(rows))
+
+        more = write_rows(self.path, "v1", random_rows(rng, 80, start=rows[-1].timestamp))
+        with ArchiveReader(self.path) as reader:
+            self.assertEqual(reader.total_rows, len(rows) + len(more))
+            self.assertEqual(list(reader.iter_rows(ArchiveQuery())), rows + more)
+        self.assertGreater(data_path.stat().st_size, complete)
+
+
+@unittest.skipUnless(hasattr(time, 'tzset'), "time.tzset not available")
+class LocalTimeGroupingTests(ArchiveTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self._tz = os.environ.get('TZ')
+
+    def tearDown(self):
+        if self._tz is None:
+            os.environ.pop('TZ', None)
+        else:
+            os.environ['TZ'] = self._tz
+        time.tzset()
+        super().tearDown()
+
+    def test_non_whole_hour_offsets(self):
+        rng = random.Random(545)
+        rows = write_rows(self.path, "v1", random_rows(rng, 400, step=600))
+
+        for tz in ('<+0545>-5:45', '<+0530>-5:30', 'UTC0'):
+            os.environ['TZ'] = tz
+            time.tzset()
+            with ArchiveReader(self.path) as reader:
+                for group_by in ('hour', 'day'):
+                    query = ArchiveQuery(group_by=group_by)
+                    self.assertEqual(reader.query(query).groups, brute_force(rows, query)[2], tz)
+
+
+if __name__ == '__main__':
+    unittest.main()
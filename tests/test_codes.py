@@ -0,0 +1,94 @@
+"""
+Tests for src/evaluator/codes.py - signal and threat level codes.
+"""
+
+import enum
+import itertools
+import unittest
+from dataclasses import dataclass
+
+from src.evaluator.codes import (
+    LEVEL_NAMES, SIGNAL_PARAMS, SIGNAL_SPACE,
+    decode_signal, encode_signal, encode_values, level_code, level_name,
+    signal_code, signal_difficulty, signal_values
+)
+
+
+class Difficulty(enum.Enum):
+    D1 = 'd1'
+    D4 = 'd4'
+
+
+@dataclass
+class ShortSignal:
+    w: int
+    f: int
+    t: int
+    r: int
+    a: int
+    d: int
+
+
+@dataclass
+class NamedSignal:
+    wind: int
+    fog: int
+    temperature: int
+    rain: int
+    avalanche: int
+    difficulty: Difficulty
+
+
+class SignalCodeTests(unittest.TestCase):
+
+    def test_round_trip_over_whole_alphabet(self):
+        ranges = [range(1, size + 1) for _, size in SIGNAL_PARAMS]
+        codes = []
+        for values in itertools.product(*ranges):
+            text = ','.join(f"{name}{value}" for (name, _), value in zip(SIGNAL_PARAMS, values))
+            code = encode_signal(text)
+            self.assertEqual(decode_signal(code), text)
+            self.assertEqual(encode_values(values), code)
+            self.assertEqual(signal_difficulty(code), values[-1])
+            codes.append(code)
+        self.assertEqual(sorted(codes), list(range(SIGNAL_SPACE)))
+
+    def test_canonicalisation(self):
+        self.assertEqual(encode_signal(" W3, f2,t1 ,r1,A5,d4 "), encode_signal("w3,f2,t1,r1,a5,d4"))
+
+    def test_invalid_signals(self):
+        for text in ("", "w4,f1,t1,r1,a1,d1", "w1,f1,t1,r1,a6,d1", "w1,f1,t1,r1,a1",
+                     "d4,a1,r1,t1,f3,w3", "w1,f1,t1,r1,a1,d1,d1"):
+            with self.assertRaises(ValueError, msg=text):
+                encode_signal(text)
+        with self.assertRaises(ValueError):
+            encode_values((1, 1, 1, 1, 1, 5))
+
+
+class ParsedSignalTests(unittest.TestCase):
+
+    def test_signal_values(self):
+        self.assertEqual(signal_values(ShortSignal(3, 2, 1, 1, 5, 4)), (3, 2, 1, 1, 5, 4))
+        named = NamedSignal(3, 2, 1, 1, 5, Difficulty.D4)
+        self.assertEqual(signal_values(named), (3, 2, 1, 1, 5, 4))
+        self.assertEqual(signal_code(named), encode_signal("w3,f2,t1,r1,a5,d4"))
+
+    def test_invalid_parsed_signals(self):
+        for signal in (ShortSignal(3, 2, 1, 1, 6, 4), ShortSignal(3, 2, 1, 1, 'x', 4), object()):
+            with self.assertRaises(ValueError, msg=repr(signal)):
+                signal_code(signal)
+
+
+class LevelCodeTests(unittest.TestCase):
+
+    def test_level_codes(self):
+        for code, name in enumerate(LEVEL_NAMES):
+            if name:
+                self.assertEqual(level_code(name), code)
+                self.assertEqual(level_name(code), name)
+        with self.assertRaises(ValueError):
+            level_code('E6')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,131 @@
+"""
+Tests for src/evaluator/compact.py - compact assessments, columnar result
+batches and the batch classifier.
+"""
+
+import unittest
+from types import SimpleNamespace
+
+from src.evaluator.codes import (
+    LEVEL_NAMES, SIGNAL_SPACE, decode_signal, encode_signal, signal_code
+)
+
+try:
+    from src.evaluator import compact
+    from src.evaluator.signal import parse_signal
+except ImportError:     # rules engine (ANTLR parser) not installed
+    compact = None
+
+
+def level_for(code):
+    return code % 5 + 1
+
+
+class CountingMatcher:
+    """Matcher double: level derived from the signal code, calls recorded"""
+
+    def __init__(self):
+        self.assessed = []
+
+    def assess_threat(self, signal, include_trace=False):
+        code = signal_code(signal)
+        self.assessed.append(code)
+        return SimpleNamespace(threat_level=SimpleNamespace(value=f"E{level_for(code)}"))
+
+
+VALID = [decode_signal(code) for code in (0, 7, 1619, 7, 0, 0, 811)]
+INVALID = ["w4,f1,t1,r1,a1,d1", "w1,f1,t1,r1,a1", "junk"]
+
+
+@unittest.skipUnless(compact, "rules engine not available")
+class CompactAssessmentTests(unittest.TestCase):
+
+    def test_lazy_fields(self):
+        code = encode_signal("w3,f3,t1,r1,a1,d4")
+        assessment = compact.CompactAssessment(code, 5)
+        self.assertEqual(assessment.signal_text, "w3,f3,t1,r1,a1,d4")
+        self.assertEqual(assessment.difficulty, 4)
+        self.assertEqual(assessment.level_name, "E5")
+        self.assertEqual(assessment.recommendations, compact.LEVEL_RECOMMENDATIONS[5])
+        self.assertEqual(assessment, compact.CompactAssessment(code, 5))
+        self.assertNotEqual(assessment, compact.CompactAssessment(code, 4))
+        self.assertEqual(len({assessment, compact.CompactAssessment(code, 5)}), 1)
+        self.assertFalse(hasattr(assessment, '__dict__'))
+
+
+@unittest.skipUnless(compact, "rules engine not available")
+class ResultBatchTests(unittest.TestCase):
+
+    def test_columns(self):
+        batch = compact.ResultBatch()
+        rows = [(0, 1), (1619, 5), (42, 3), (42, 3)]
+        for code, level in rows:
+            batch.append(code, level)
+
+        self.assertEqual(len(batch), 4)
+        self.assertEqual(batch.nbytes, 3 * len(rows))
+        self.assertEqual(batch.level_counts(), [0, 1, 0, 2, 0, 1])
+        self.assertEqual(len(batch.level_counts()), len(LEVEL_NAMES))
+        self.assertEqual(batch[1], compact.CompactAssessment(1619, 5))
+        self.assertEqual([(a.code, a.level) for a in batch], rows)
+
+    def test_error_list_is_capped(self):
+        batch = compact.ResultBatch()
+        for i in range(compact.MAX_BATCH_ERRORS + 50):
+            batch.add_error(f"error {i}")
+        self.assertEqual(batch.error_count, compact.MAX_BATCH_ERRORS + 50)
+        self.assertEqual(len(batch.errors), compact.MAX_BATCH_ERRORS)
+        self.assertEqual(batch.errors[-1], f"error {compact.MAX_BATCH_ERRORS - 1}")
+
+
+@unittest.skipUnless(compact, "rules engine not available")
+class BatchClassifierTests(unittest.TestCase):
+
+    def setUp(self):
+        self.matcher = CountingMatcher()
+        self.classifier = compact.BatchClassifier(self.matcher)
+
+    def test_matcher_called_once_per_code(self):
+        batch = self.classifier.classify(VALID + VALID)
+        codes = [encode_signal(text) for text in VALID + VALID]
+        self.assertEqual(list(batch.codes), codes)
+        self.assertEqual(list(batch.levels), [level_for(code) for code in codes])
+        self.assertEqual(sorted(self.matcher.assessed), sorted(set(codes)))
+
+    def test_batch_boundaries(self):
+        lines = VALID[:3] + INVALID[:1] + VALID[3:] + INVALID[1:]
+        batches = list(self.classifier.iter_batches(lines, batch_size=3))
+        self.assertEqual([len(batch) for batch in batches], [3, 3, 1])
+        self.assertEqual([batch.error_count for batch in batches], [0, 1, 2])
+        self.assertEqual([a.signal_text for batch in batches for a in batch], VALID)
+
+        # A trailing batch holding only errors is still yielded
+        batches = list(self.classifier.iter_batches(VALID[:2] + INVALID, batch_size=2))
+        self.assertEqual([(len(b), b.error_count) for b in batches], [(2, 0), (0, 3)])
+        self.assertEqual(list(self.classifier.iter_batches([])), [])
+
+    def test_validation_matches_parse_signal(self):
+        lines = VALID + INVALID + [" w1,f1,t1,r1,a1,d1", "W1,F1,T1,R1,A1,D1",
+                                   "d4,a1,r1,t1,f3,w3", "w1, f1, t1, r1, a1, d1"]
+        accepted = []
+        for line in lines:
+            try:
+                accepted.append(signal_code(parse_signal(line)))
+            except ValueError:
+                pass
+
+        batch = self.classifier.classify(lines)
+        self.assertEqual(list(batch.codes), accepted)
+        self.assertEqual(batch.error_count, len(lines) - len(accepted))
+        # Cached line codes give the same answer the second time
+        self.assertEqual(list(self.classifier.classify(lines).codes), accepted)
+
+    def test_table_classifies_whole_alphabet(self):
+        table = self.classifier.table()
+        self.assertEqual(len(table), SIGNAL_SPACE)
+        self.assertEqual(list(table), [level_for(code) for code in range(SIGNAL_SPACE)])
+        self.assertEqual(len(self.matcher.assessed), SIGNAL_SPACE)
+
+
+if __name__ == '__main__':
+    unittest.main()
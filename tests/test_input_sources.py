@@ -0,0 +1,146 @@
+"""
+Tests for src/input_sources.py - compression detection, source expansion
+and chunked line splitting.
+
+Run from the project root:
+    python -m pytest tests
+    python -m unittest discover tests
+"""
+
+import bz2
+import gzip
+import io
+import lzma
+import tempfile
+import unittest
+from pathlib import Path
+
+from src.input_sources import (
+    InputStats, detect_compression, expand_sources, iter_lines,
+    iter_signal_lines, oversized_line
+)
+
+
+SIGNALS = ["w1,f1,t1,r1,a1,d1", "w3,f2,t1,r1,a5,d4", "w2,f3,t3,r2,a2,d2"]
+TEXT = "# header\n" + "\n".join(SIGNALS) + "\n\n  \n"
+
+
+class IterLinesTests(unittest.TestCase):
+
+    def lines(self, data: bytes, chunk_size: int, **kwargs):
+        return list(iter_lines(io.BytesIO(data), chunk_size, **kwargs))
+
+    def test_skips_blank_and_comment_lines(self):
+        self.assertEqual(self.lines(TEXT.encode(), 1024), SIGNALS)
+
+    def test_same_lines_for_every_chunk_size(self):
+        data = TEXT.encode()
+        for chunk_size in range(1, len(data) + 2):
+            self.assertEqual(self.lines(data, chunk_size), SIGNALS, chunk_size)
+
+    def test_last_line_without_newline(self):
+        self.assertEqual(self.lines(b"w1,f1,t1,r1,a1,d1\r\nw1,f1,t1,r1,a1,d2", 7),
+                         ["w1,f1,t1,r1,a1,d1", "w1,f1,t1,r1,a1,d2"])
+
+    def test_stats(self):
+        stats = InputStats()
+        list(iter_lines(io.BytesIO(TEXT.encode()), 8, stats))
+        self.assertEqual(stats.lines, len(SIGNALS))
+        self.assertEqual(stats.bytes_decoded, len(TEXT.encode()))
+
+    def test_oversized_line_is_reported_not_buffered(self):
+        junk = b"x" * 5000
+        data = b"w1,f1,t1,r1,a1,d1\n" + junk + b"\nw1,f1,t1,r1,a1,d2\n"
+        for chunk_size in (16, 100, 1024, 10000):
+            self.assertEqual(
+                self.lines(data, chunk_size, max_line_length=1000),
+                ["w1,f1,t1,r1,a1,d1", oversized_line(len(junk)), "w1,f1,t1,r1,a1,d2"],
+                chunk_size
+            )
+
+    def test_oversized_trailing_line(self):
+        data = b"w1,f1,t1,r1,a1,d1\n" + b"\x00" * 3000
+        self.assertEqual(self.lines(data, 256, max_line_length=100),
+                         ["w1,f1,t1,r1,a1,d1", oversized_line(3000)])
+
+
+class SourceTests(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self._tmp.name)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_compressed_sources(self):
+        data = TEXT.encode()
+        files = {
+            "plain.txt": data,
+            "a.txt.gz": gzip.compress(data),
+            "b.txt.xz": lzma.compress(data),
+            "c.txt.bz2": bz2.compress(data),
+            "gzip_no_extension": gzip.compress(data),
+        }
+        for name, content in files.items():
+            (self.dir / name).write_bytes(content)
+
+        self.assertIsNone(detect_compression(str(self.dir / "plain.txt")))
+        self.assertEqual(detect_compression(str(self.dir / "gzip_no_extension")), "gzip")
+
+        for name in files:
+            stats = InputStats()
+            lines = list(iter_signal_lines([str(self.dir / name)], chunk_size=5, stats=stats))
+            self.assertEqual(lines, SIGNALS, name)
+            self.assertEqual(stats.bytes_read, len(files[name]), name)
+            self.assertEqual(stats.bytes_decoded, len(data), name)
+
+    def test_failed_source_is_skipped_and_recorded(self):
+        data = TEXT.encode()
+        files = {
+            "a.txt": data,
+            "b.txt.gz": data,                           # not gzip
+            "c.txt.xz": lzma.compress(data)[:-20],      # truncated
+            "d.txt.bz2": bz2.compress(data),
+        }
+        for name, content in files.items():
+            (self.dir / name).write_bytes(content)
+        sources = [str(self.dir / name) for name in files] + [str(self.dir / "missing.txt")]
+
+        stats = InputStats()
+        lines = list(iter_signal_lines(sources, stats=stats))
+        self.assertEqual(lines[:len(SIGNALS)], SIGNALS)
+        self.assertEqual(lines[-len(SIGNALS):], SIGNALS)
+        self.assertEqual(stats.sources, 5)
+        self.assertEqual(
+            [failure.split(": ")[0] for failure in stats.failed_sources],
+            [sources[1], sources[2], sources[4]]
+        )
+
+        # Without stats there is nowhere to record it
+        with self.assertRaises(OSError):
+            list(iter_signal_lines(sources[:2]))
+
+    def test_expand_directory_and_glob(self):
+        (self.dir / "sub").mkdir()
+        for name in ("b.txt", "a.txt", "sub/c.txt", ".hidden"):
+            (self.dir / name).write_text("w1,f1,t1,r1,a1,d1\n")
+
+        self.assertEqual(
+            expand_sources(str(self.dir)),
+            [str(self.dir / "a.txt"), str(self.dir / "b.txt"), str(self.dir / "sub" / "c.txt")]
+        )
+        self.assertEqual(
+            expand_sources(str(self.dir / "*.txt")),
+            [str(self.dir / "a.txt"), str(self.dir / "b.txt")]
+        )
+        self.assertEqual(expand_sources("-"), ["-"])
+
+        with self.assertRaises(FileNotFoundError):
+            expand_sources(str(self.dir / "*.gz"))
+        with self.assertRaises(FileNotFoundError):
+            expand_sources(str(self.dir / "missing.txt"))
+
+
+if __name__ == '__main__':
+    unittest.main()
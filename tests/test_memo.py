@@ -0,0 +1,162 @@
+"""
+Tests for src/evaluator/memo.py - LRU and CLOCK eviction and the cache key
+shared by assess_text() and assess_threat().
+"""
+
+import unittest
+from dataclasses import dataclass
+from unittest import mock
+
+from src.evaluator.codes import decode_signal
+
+try:
+    from src.evaluator import memo
+    from src.evaluator.signal import parse_signal
+except ImportError:     # rules engine (ANTLR parser) not installed
+    memo = None
+
+
+class CountingMatcher:
+    """Matcher double: records the key of every signal it assesses"""
+
+    def __init__(self, rules_db=None):
+        self.rules_db = rules_db
+        self.assessed = []
+
+    def assess_threat(self, signal, include_trace=False):
+        self.assessed.append(memo.signal_key(signal))
+        return ('assessment', memo.signal_key(signal))
+
+
+@dataclass
+class ExtendedSignal:
+    """Parsed signal of a grown grammar: scales beyond the code alphabet"""
+    w: int
+    f: int
+    t: int
+    r: int
+    a: int
+    d: int
+    snow: int = 1
+
+
+@unittest.skipUnless(memo, "rules engine not available")
+class EvictionTests(unittest.TestCase):
+
+    def test_lru_evicts_least_recently_used(self):
+        cache = memo.LRUCache(2)
+        self.assertFalse(cache.put('a', 1))
+        self.assertFalse(cache.put('b', 2))
+        self.assertEqual(cache.get('a'), 1)
+        self.assertTrue(cache.put('c', 3))
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual((cache.get('a'), cache.get('c'), len(cache)), (1, 3, 2))
+
+    def test_clock_gives_referenced_entries_a_second_chance(self):
+        cache = memo.ClockCache(3)
+        for key in 'abc':
+            cache.put(key, key.upper())
+        cache.get('a')
+        cache.get('c')
+        # Hand clears a's bit, evicts b (unreferenced)
+        self.assertTrue(cache.put('d', 'D'))
+        self.assertIsNone(cache.get('b'))
+        # a lost its bit on the first sweep, so it goes next
+        self.assertTrue(cache.put('e', 'E'))
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual([cache.get(key) for key in 'cde'], ['C', 'D', 'E'])
+        self.assertEqual(len(cache), 3)
+
+    def test_update_does_not_evict(self):
+        for cache in (memo.LRUCache(2), memo.ClockCache(2)):
+            cache.put('a', 1)
+            cache.put('b', 2)
+            self.assertFalse(cache.put('a', 10))
+            self.assertEqual((cache.get('a'), cache.get('b')), (10, 2))
+
+    def test_stats_count_evictions(self):
+        for policy in memo.POLICIES:
+            matcher = memo.MemoizedMatcher(CountingMatcher(), capacity=4, policy=policy)
+            for code in list(range(6)) + [5, 4]:
+                matcher.assess_text(decode_signal(code))
+            stats = matcher.stats
+            self.assertEqual((stats.hits, stats.misses), (2, 6), policy)
+            self.assertEqual((stats.evictions, stats.size), (2, 4), policy)
+
+
+@unittest.skipUnless(memo, "rules engine not available")
+class CacheKeyTests(unittest.TestCase):
+
+    def setUp(self):
+        self.inner = CountingMatcher()
+        self.matcher = memo.MemoizedMatcher(self.inner, capacity=8)
+
+    def test_invalid_text_raises_cold_and_warm(self):
+        self.matcher.assess_text("w3,f3,t1,r1,a1,d4")
+        for _ in range(2):
+            for text in ("w3,f3,t1,r1,a1", "w4,f3,t1,r1,a1,d4", "w3,f3,t1,r1,a1,d4,d4", "junk"):
+                with self.assertRaises(ValueError, msg=text):
+                    self.matcher.assess_text(text)
+        self.assertEqual(len(self.inner.assessed), 1)
+
+    def test_warm_and_cold_agree_with_parse_signal(self):
+        texts = ["w3,f3,t1,r1,a1,d4", "d4,a1,r1,t1,f3,w3", " W3, f3,t1 ,r1,a1,D4 ",
+                 "w3,f3,t1,r1,a1,d4,w3"]
+        for text in texts:
+            try:
+                expected = memo.signal_key(parse_signal(text))
+            except ValueError:
+                expected = None
+            for _ in range(2):
+                if expected is None:
+                    with self.assertRaises(ValueError, msg=text):
+                        self.matcher.assess_text(text)
+                else:
+                    self.assertEqual(self.matcher.assess_text(text)[1], expected, text)
+
+    def test_text_and_parsed_signal_share_one_entry(self):
+        text = "w1,f2,t3,r1,a5,d2"
+        first = self.matcher.assess_threat(parse_signal(text))
+        self.assertIs(self.matcher.assess_text(text), first)
+        self.assertIs(self.matcher.assess_threat(parse_signal(text)), first)
+        self.assertEqual(self.matcher.stats.size, 1)
+        self.assertEqual(len(self.inner.assessed), 1)
+
+    def test_text_hit_skips_parsing_until_evicted(self):
+        matcher = memo.MemoizedMatcher(self.inner, capacity=2)
+        texts = [decode_signal(code) for code in (0, 1, 2)]
+        with mock.patch.object(memo, 'parse_signal', wraps=parse_signal) as parse:
+            for text in texts + texts[1:]:
+                matcher.assess_text(text)
+            self.assertEqual((parse.call_count, len(self.inner.assessed)), (3, 3))
+
+            # texts[0] was evicted - parsed and assessed again, same key
+            matcher.assess_text(texts[0])
+            self.assertEqual(parse.call_count, 4)
+        self.assertEqual(self.inner.assessed[-1], self.inner.assessed[0])
+
+    def test_signal_outside_alphabet_is_cached_and_evicted(self):
+        matcher = memo.MemoizedMatcher(self.inner, capacity=2, policy='clock')
+        beyond = [ExtendedSignal(4, 1, 1, 1, 6, 5, snow) for snow in (1, 2, 3)]
+
+        first = matcher.assess_threat(beyond[0])
+        self.assertIs(matcher.assess_threat(ExtendedSignal(4, 1, 1, 1, 6, 5, 1)), first)
+        self.assertEqual(matcher.stats.size, 1)
+
+        matcher.assess_threat(beyond[1])
+        matcher.assess_threat(beyond[2])
+        self.assertEqual(matcher.stats.evictions, 1)
+        self.assertEqual(matcher.stats.size, 2)
+        self.assertEqual(len(self.inner.assessed), 3)
+        self.assertNotEqual(memo.signal_key(beyond[0]), memo.signal_key(beyond[1]))
+
+    def test_rules_change_invalidates(self):
+        self.matcher.assess_text("w1,f1,t1,r1,a1,d1")
+        self.inner.rules_db = object()
+        self.matcher.assess_text("w1,f1,t1,r1,a1,d1")
+        self.assertEqual(len(self.inner.assessed), 2)
+        self.assertEqual(self.matcher.stats.invalidations, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
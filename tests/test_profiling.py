@@ -0,0 +1,87 @@
+"""
+Tests for src/profiling.py - phase accounting and instrumented passes.
+"""
+
+import os
+import pstats
+import tempfile
+import unittest
+
+from src.profiling import PhaseProfiler
+
+
+def busy_parse(n):
+    return sum(i * i for i in range(n))
+
+
+class PhaseProfilerTests(unittest.TestCase):
+
+    def test_rules_parse_split_per_call(self):
+        profiler = PhaseProfiler()
+        for n in (20000, 50000, 10000):
+            self.assertEqual(profiler.profile_rules_parse(busy_parse, n), busy_parse(n))
+
+        parts = [name for name in profiler.wall if name.startswith('rules parse/')]
+        self.assertTrue(parts)
+        self.assertEqual(profiler.calls['rules parse'], 3)
+        # Each call splits only its own time - the parts add up to the total
+        self.assertAlmostEqual(sum(profiler.wall[p] for p in parts), profiler.wall['rules parse'])
+        self.assertAlmostEqual(sum(profiler.cpu[p] for p in parts), profiler.cpu['rules parse'])
+
+    def test_disabled_profiler_records_nothing(self):
+        profiler = PhaseProfiler(enabled=False)
+        with profiler.phase('classification'):
+            pass
+        self.assertEqual(profiler.profile_rules_parse(busy_parse, 10), busy_parse(10))
+        self.assertEqual(list(profiler.timed_iter([1, 2], 'input reading')), [1, 2])
+        self.assertEqual(profiler.wall, {})
+
+    def test_timed_chunks(self):
+        profiler = PhaseProfiler()
+        chunks = list(profiler.timed_chunks(range(10), 'input reading', size=4))
+        self.assertEqual(chunks, [[0, 1, 2, 3], [4, 5, 6, 7], [8, 9]])
+        self.assertEqual(profiler.calls['input reading'], 10)
+
+        with profiler.phase('classification', calls=4):
+            pass
+        self.assertEqual(profiler.calls['classification'], 4)
+
+    def test_record_keeps_measured_phases(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            prefix = os.path.join(tmp, 'run')
+            profiler = PhaseProfiler(output_prefix=prefix)
+
+            def workload():
+                with profiler.phase('classification'):
+                    busy_parse(30000)
+                print("output of the instrumented pass")
+
+            workload()
+            measured = dict(profiler.wall), dict(profiler.calls)
+            profiler.record(workload)
+            self.assertEqual((profiler.wall, profiler.calls), measured)
+
+            pstats_path, collapsed_path = profiler.write_dumps()
+            self.assertTrue(os.path.getsize(pstats_path))
+            self.assertTrue(os.path.exists(collapsed_path))
+
+            # Phase timers are off in the instrumented passes
+            profiled = {
+                name for filename, _, name in pstats.Stats(pstats_path).stats
+                if filename.endswith('profiling.py')
+            }
+            self.assertFalse(profiled & {'add', '_sample'}, profiled)
+            with open(collapsed_path, encoding='utf-8') as f:
+                self.assertNotIn('profiling.py', f.read())
+
+    def test_no_dumps_without_instrumented_pass(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            profiler = PhaseProfiler(output_prefix=os.path.join(tmp, 'run'))
+            with profiler.phase('classification'):
+                pass
+            self.assertEqual(profiler.write_dumps(), (None, None))
+            self.assertEqual(os.listdir(tmp), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
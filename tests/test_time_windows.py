@@ -0,0 +1,179 @@
+"""
+Tests for src/time_windows.py - timestamps, escalation rules and the
+ring-buffer window aggregator (checked against a brute-force count).
+"""
+
+import random
+import unittest
+from datetime import datetime
+
+from src.time_windows import (
+    DIFFICULTIES, LEVELS, EscalationRule, WindowedAggregator, bucket_seconds_for,
+    parse_duration, parse_escalation_rule, split_timestamp
+)
+
+
+class BruteForceWindows:
+    """Reference model: keeps every accepted event and counts by scanning"""
+
+    def __init__(self, bucket_seconds: int, ring_size: int):
+        self.bucket_seconds = bucket_seconds
+        self.ring_size = ring_size
+        self.head = None
+        self.events = []
+
+    def add(self, level: int, difficulty: int, timestamp: float) -> bool:
+        bucket = int(timestamp // self.bucket_seconds)
+        self.head = bucket if self.head is None else max(self.head, bucket)
+        if self.head - bucket >= self.ring_size:
+            return False
+        self.events.append((bucket, level, difficulty))
+        return True
+
+    def count(self, window: int, min_level: int, difficulty=None, previous=False) -> int:
+        span = window // self.bucket_seconds
+        newest = self.head - span if previous else self.head
+        return sum(
+            1 for bucket, level, d in self.events
+            if newest - span < bucket <= newest and level >= min_level
+            and (difficulty is None or d == difficulty)
+        )
+
+
+class ParsingTests(unittest.TestCase):
+
+    def test_split_timestamp(self):
+        self.assertEqual(split_timestamp("w1,f1,t1,r1,a1,d1"), (None, "w1,f1,t1,r1,a1,d1"))
+        self.assertEqual(split_timestamp("1736000000,w1,f1,t1,r1,a1,d1"),
+                         (1736000000.0, "w1,f1,t1,r1,a1,d1"))
+        stamp, text = split_timestamp("2025-01-05T06:15:00,w3,f3,t1,r1,a1,d4")
+        self.assertEqual(stamp, datetime(2025, 1, 5, 6, 15).timestamp())
+        self.assertEqual(text, "w3,f3,t1,r1,a1,d4")
+        with self.assertRaises(ValueError):
+            split_timestamp("2025-13-45,w1,f1,t1,r1,a1,d1")
+
+    def test_parse_duration(self):
+        self.assertEqual(parse_duration("15"), 900)
+        self.assertEqual(parse_duration("30s"), 30)
+        self.assertEqual(parse_duration("2h"), 7200)
+        with self.assertRaises(ValueError):
+            parse_duration("5d")
+
+    def test_parse_escalation_rule(self):
+        self.assertEqual(parse_escalation_rule("15m@d4:count>=10"),
+                         EscalationRule(900, count=10, difficulty=4))
+        self.assertEqual(parse_escalation_rule("5m:rate>=3,min=5", min_level=5),
+                         EscalationRule(300, count=5, rate=3.0, min_level=5))
+        with self.assertRaises(ValueError):
+            parse_escalation_rule("5m:count>10")
+
+
+class WindowedAggregatorTests(unittest.TestCase):
+
+    def assert_matches(self, aggregator, reference):
+        for window in aggregator.windows:
+            for min_level in range(1, LEVELS + 1):
+                for difficulty in (None,) + tuple(range(1, DIFFICULTIES + 1)):
+                    self.assertEqual(
+                        aggregator.count(window, min_level, difficulty),
+                        reference.count(window, min_level, difficulty),
+                        (window, min_level, difficulty)
+                    )
+                    self.assertEqual(
+                        aggregator.previous_count(window, min_level, difficulty),
+                        reference.count(window, min_level, difficulty, previous=True),
+                        (window, min_level, difficulty, 'previous')
+                    )
+
+    def test_matches_brute_force(self):
+        rng = random.Random(28)
+        aggregator = WindowedAggregator((60, 300, 900), bucket_seconds=60)
+        reference = BruteForceWindows(60, aggregator._size)
+
+        now = 1_736_000_000.0
+        for step in range(3000):
+            roll = rng.random()
+            if roll < 0.01:
+                now += rng.uniform(3600, 7200)        # gap longer than the ring
+            elif roll < 0.1:
+                now += rng.uniform(60, 600)           # idle minutes
+            else:
+                now += rng.uniform(0, 20)
+            # Occasional late (out-of-order) signals, some older than the ring
+            timestamp = now - rng.uniform(0, 2400) if rng.random() < 0.05 else now
+
+            level = rng.randint(1, LEVELS)
+            difficulty = rng.randint(1, DIFFICULTIES)
+            accepted = reference.add(level, difficulty, timestamp)
+            dropped = aggregator.late_dropped
+            aggregator.add(level, difficulty, timestamp)
+            self.assertEqual(aggregator.late_dropped - dropped, 0 if accepted else 1)
+
+            if step % 25 == 0:
+                self.assert_matches(aggregator, reference)
+
+        self.assert_matches(aggregator, reference)
+        self.assertGreater(aggregator.late_dropped, 0)
+
+    def test_advance_to_expires_counts(self):
+        aggregator = WindowedAggregator((300,), bucket_seconds=60)
+        aggregator.add(5, 4, 1000.0)
+        self.assertEqual(aggregator.count(300), 1)
+        aggregator.advance_to(1000.0 + 300)
+        self.assertEqual(aggregator.count(300), 0)
+        self.assertEqual(aggregator.previous_count(300), 1)
+        aggregator.advance_to(1000.0 + 600)
+        self.assertEqual(aggregator.previous_count(300), 0)
+
+    def test_window_must_be_multiple_of_bucket(self):
+        with self.assertRaises(ValueError):
+            WindowedAggregator((90,), bucket_seconds=60)
+
+    def test_bucket_seconds_for(self):
+        self.assertEqual(bucket_seconds_for([300, 900, 3600]), 60)
+        self.assertEqual(bucket_seconds_for([30, 3600]), 30)
+        self.assertEqual(bucket_seconds_for([90, 45]), 15)
+        self.assertEqual(bucket_seconds_for([]), 60)
+
+        windows = [parse_duration(w) for w in "30s,1h".split(',')]
+        aggregator = WindowedAggregator(windows, bucket_seconds_for(windows))
+        aggregator.add(4, 1, 1000.0)
+        aggregator.add(4, 1, 1040.0)
+        self.assertEqual((aggregator.count(30), aggregator.count(3600)), (1, 2))
+
+    def test_escalation_is_edge_triggered(self):
+        fired = []
+        rule = parse_escalation_rule("5m@d4:count>=3")
+        aggregator = WindowedAggregator(
+            (), rules=[rule],
+            on_escalation=lambda rule, count, previous, ts: fired.append((count, ts))
+        )
+
+        for i in range(5):
+            aggregator.add(4, 4, 1000.0 + i)
+        aggregator.add(5, 3, 1010.0)            # other difficulty - not counted
+        self.assertEqual(fired, [(3, 1002.0)])
+
+        # Condition stops holding once the window moves on, then re-arms
+        aggregator.advance_to(1000.0 + 600)
+        for i in range(3):
+            aggregator.add(5, 4, 1600.0 + i)
+        self.assertEqual(fired, [(3, 1002.0), (3, 1602.0)])
+
+    def test_rate_rule(self):
+        fired = []
+        rule = parse_escalation_rule("5m:rate>=3,min=2")
+        aggregator = WindowedAggregator(
+            (), rules=[rule],
+            on_escalation=lambda rule, count, previous, ts: fired.append((count, previous))
+        )
+
+        aggregator.add(4, 1, 0.0)
+        aggregator.add(4, 1, 10.0)              # 2 >= 3 * max(0, 1) - not yet
+        self.assertEqual(fired, [])
+        aggregator.add(4, 1, 20.0)
+        self.assertEqual(fired, [(3, 0)])
+
+
+if __name__ == '__main__':
+    unittest.main()